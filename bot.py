@@ -2,9 +2,12 @@
 Main Telegram bot entry point.
 """
 
+import asyncio
+import logging
 import os
 from dotenv import load_dotenv
 from telegram import Update
+from telegram.request import HTTPXRequest
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes, ConversationHandler
 import config
 from handlers import commands, callbacks, messages, receipt_conversation, invoice_conversation
@@ -15,6 +18,18 @@ load_dotenv()
 
 BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 
+# "polling" (default, for development) or "webhook" (production: Telegram pushes updates to us)
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+WEBHOOK_HOST = os.getenv("HOST")
+WEBHOOK_PORT = int(os.getenv("PORT", 8443))
+WEBHOOK_SECRET = os.getenv("TG_SECRET")
+
+logger = logging.getLogger(__name__)
+
+# Combined filters, built once and shared by the handlers below
+TEXT_NOT_COMMAND = filters.TEXT & ~filters.COMMAND
+FILE_FILTER = filters.PHOTO | filters.Document.ALL
+
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /start command."""
@@ -25,49 +40,103 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
+# Simple command handlers: (command, callback, block).
+# block=False lets slow file/ledger handlers run without holding up the handler chain.
+COMMANDS = [
+    ("start", start_command, True),
+    ("help", commands.help_command, True),
+    ("update", commands.update_command, True),
+    ("recommend", commands.recommend_command, True),
+    ("deposit", commands.deposit_command, True),
+    ("summary", commands.summary_command, True),
+    ("monthly", commands.monthly_command, True),
+    ("payni", commands.payni_command, True),
+    ("paytax", commands.paytax_command, True),
+    ("projection", commands.projection_command, True),
+    ("optimizer", commands.optimizer_command, True),
+    ("expense", commands.expense_command, False),
+    ("excel", commands.excel_command, False),
+    ("last", commands.last_entries_command, False),
+    ("settings", commands.settings_command, True),
+    ("setmonth", commands.setmonth_command, True),
+    ("nextmonth", commands.nextmonth_command, True),
+]
+
+
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle errors."""
-    print(f"Update {update} caused error {context.error}")
+    logger.error(
+        "Update %s caused error",
+        getattr(update, "update_id", None),
+        exc_info=context.error,
+    )
     if update and update.effective_message:
         await update.effective_message.reply_text(
             "❌ An error occurred. Please try again or use /help."
         )
 
 
+async def post_init(application: Application):
+    """Start background tasks once the bot is initialized."""
+    application.bot_data["state_writer"] = asyncio.create_task(config.run_state_writer())
+
+
+async def post_shutdown(application: Application):
+    """Stop background tasks, flushing any unsaved state."""
+    writer = application.bot_data.pop("state_writer", None)
+    if writer:
+        writer.cancel()
+        try:
+            await writer
+        except asyncio.CancelledError:
+            pass
+
+
 def main():
     """Start the bot."""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    # httpx logs every getUpdates request at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    
     if not BOT_TOKEN:
         print("❌ TELEGRAM_BOT_TOKEN not found in .env file")
         return
+    if BOT_MODE == "webhook" and not WEBHOOK_HOST:
+        print("❌ HOST must be set in .env file when BOT_MODE=webhook")
+        return
     
     # Ensure state exists
     config.ensure_state_exists()
     
-    # Create application
-    application = Application.builder().token(BOT_TOKEN).build()
+    # Create application (updates are processed concurrently so slow handlers don't stall other chats)
+    # Bot API calls share one pooled HTTP/2 client (one TLS handshake, multiplexed requests);
+    # getUpdates long-polls on its own connection so it never holds up outgoing replies
+    bot_request = HTTPXRequest(connection_pool_size=50, http_version="2", read_timeout=35, connect_timeout=10)
+    get_updates_request = HTTPXRequest(http_version="2", read_timeout=35, connect_timeout=10)
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .request(bot_request)
+        .get_updates_request(get_updates_request)
+        .concurrent_updates(True)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
     
     # Register commands
-    application.add_handler(CommandHandler("start", start_command))
-    application.add_handler(CommandHandler("help", commands.help_command))
-    application.add_handler(CommandHandler("update", commands.update_command))
-    application.add_handler(CommandHandler("recommend", commands.recommend_command))
-    application.add_handler(CommandHandler("deposit", commands.deposit_command))
-    application.add_handler(CommandHandler("summary", commands.summary_command))
-    application.add_handler(CommandHandler("monthly", commands.monthly_command))
-    application.add_handler(CommandHandler("payni", commands.payni_command))
-    application.add_handler(CommandHandler("paytax", commands.paytax_command))
-    application.add_handler(CommandHandler("projection", commands.projection_command))
-    application.add_handler(CommandHandler("optimizer", commands.optimizer_command))
+    for name, callback, block in COMMANDS:
+        application.add_handler(CommandHandler(name, callback, block=block))
     
     # Conversational receipt handler (new improved version)
     receipt_conv_handler = ConversationHandler(
         entry_points=[CommandHandler("receipt", receipt_conversation.start_receipt)],
         states={
-            receipt_conversation.AMOUNT: [MessageHandler(filters.TEXT & ~filters.COMMAND, receipt_conversation.receipt_amount)],
-            receipt_conversation.CLIENT: [MessageHandler(filters.TEXT & ~filters.COMMAND, receipt_conversation.receipt_client)],
-            receipt_conversation.DESCRIPTION: [MessageHandler(filters.TEXT & ~filters.COMMAND, receipt_conversation.receipt_description)],
+            receipt_conversation.AMOUNT: [MessageHandler(TEXT_NOT_COMMAND, receipt_conversation.receipt_amount)],
+            receipt_conversation.CLIENT: [MessageHandler(TEXT_NOT_COMMAND, receipt_conversation.receipt_client)],
+            receipt_conversation.DESCRIPTION: [MessageHandler(TEXT_NOT_COMMAND, receipt_conversation.receipt_description)],
             receipt_conversation.PAYMENT_METHOD: [
-                CallbackQueryHandler(receipt_conversation.receipt_payment_method, pattern="^payment_")
+                CallbackQueryHandler(receipt_conversation.receipt_payment_method, pattern="^payment_", block=False)
             ],
         },
         fallbacks=[CommandHandler("cancel", receipt_conversation.cancel_receipt)],
@@ -78,25 +147,19 @@ def main():
     invoice_conv_handler = ConversationHandler(
         entry_points=[CommandHandler("invoice", invoice_conversation.start_invoice)],
         states={
-            invoice_conversation.AMOUNT: [MessageHandler(filters.TEXT & ~filters.COMMAND, invoice_conversation.invoice_amount)],
-            invoice_conversation.CLIENT: [MessageHandler(filters.TEXT & ~filters.COMMAND, invoice_conversation.invoice_client)],
-            invoice_conversation.DESCRIPTION: [MessageHandler(filters.TEXT & ~filters.COMMAND, invoice_conversation.invoice_description)],
+            invoice_conversation.AMOUNT: [MessageHandler(TEXT_NOT_COMMAND, invoice_conversation.invoice_amount)],
+            invoice_conversation.CLIENT: [MessageHandler(TEXT_NOT_COMMAND, invoice_conversation.invoice_client)],
+            invoice_conversation.DESCRIPTION: [MessageHandler(TEXT_NOT_COMMAND, invoice_conversation.invoice_description, block=False)],
         },
         fallbacks=[CommandHandler("cancel", invoice_conversation.cancel_invoice)],
     )
     application.add_handler(invoice_conv_handler)
-    application.add_handler(CommandHandler("expense", commands.expense_command))
-    application.add_handler(CommandHandler("excel", commands.excel_command))
-    application.add_handler(CommandHandler("last", commands.last_entries_command))
-    application.add_handler(CommandHandler("settings", commands.settings_command))
-    application.add_handler(CommandHandler("setmonth", commands.setmonth_command))
-    application.add_handler(CommandHandler("nextmonth", commands.nextmonth_command))
     
     # Register message handlers for file uploads
-    application.add_handler(MessageHandler(filters.PHOTO | filters.Document.ALL, messages.handle_expense_document))
+    application.add_handler(MessageHandler(FILE_FILTER, messages.handle_expense_document, block=False))
     
     # Register callbacks
-    application.add_handler(CallbackQueryHandler(callbacks.handle_callback))
+    application.add_handler(CallbackQueryHandler(callbacks.handle_callback, block=False))
     
     # Register error handler
     application.add_error_handler(error_handler)
@@ -104,8 +167,26 @@ def main():
     # Start bot
     print("🤖 Bot starting...")
     print("✅ Bot is running. Press Ctrl+C to stop.")
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
-
+    if BOT_MODE == "webhook":
+        print(f"🌐 Webhook mode: https://{WEBHOOK_HOST}/ (listening on port {WEBHOOK_PORT})")
+        application.run_webhook(
+            listen="0.0.0.0",
+            port=WEBHOOK_PORT,
+            url_path=BOT_TOKEN,
+            webhook_url=f"https://{WEBHOOK_HOST}/{BOT_TOKEN}",
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=Update.ALL_TYPES,
+            drop_pending_updates=True,
+        )
+    else:
+        # Long-poll with a long server-side timeout to cut empty getUpdates round-trips,
+        # and skip the backlog accumulated while the bot was offline
+        application.run_polling(
+            allowed_updates=Update.ALL_TYPES,
+            poll_interval=0.0,
+            timeout=30,
+            drop_pending_updates=True,
+        )
 
 if __name__ == "__main__":
     main()
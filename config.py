@@ -2,6 +2,7 @@
 Configuration management and default settings.
 """
 
+import asyncio
 import json
 import os
 from pathlib import Path
@@ -9,6 +10,11 @@ from datetime import datetime
 import pytz
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:  # optional speedup, fall back to the stdlib encoder
+    orjson = None
+
 # Load environment variables
 load_dotenv()
 
@@ -124,18 +130,139 @@ DEFAULT_STATE = {
 }
 
 
+# Parsed state kept in memory, keyed by path and re-read only when the file's mtime changes.
+# "version" is bumped whenever the cached object is replaced or saved, so derived results can be memoized.
+# "dirty" means the cached state has been saved but not yet written to disk.
+_STATE_CACHE = {"path": None, "mtime": None, "data": None, "version": 0, "dirty": False}
+
+# While the writer task runs, saves are coalesced and written at most once per window (seconds)
+STATE_FLUSH_WINDOW = 0.1
+_STATE_WRITER = {"loop": None, "event": None}
+
+
 def load_state(filepath=STATE_FILE):
-    """Load state from JSON file."""
-    if os.path.exists(filepath):
-        with open(filepath, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return DEFAULT_STATE.copy()
+    """
+    Load state from JSON file (cached until the file changes on disk).
+    
+    The returned dict is the shared cached object, not a copy: every caller sees the same
+    data, and a mutation is visible to other handlers immediately, even before save_state().
+    Mutate it only when the change will be saved, and undo the change on any path that
+    fails before save_state() is reached.
+    """
+    if _STATE_CACHE["dirty"] and _STATE_CACHE["path"] == filepath:
+        return _STATE_CACHE["data"]
+    
+    try:
+        mtime = os.stat(filepath).st_mtime_ns
+    except FileNotFoundError:
+        return DEFAULT_STATE.copy()
+    
+    if _STATE_CACHE["path"] == filepath and _STATE_CACHE["mtime"] == mtime:
+        return _STATE_CACHE["data"]
+    
+    with open(filepath, "rb") as f:
+        raw = f.read()
+    try:
+        state = orjson.loads(raw) if orjson else json.loads(raw)
+    except ValueError:
+        # Files written by the stdlib encoder may contain Infinity, which orjson rejects
+        state = json.loads(raw)
+    if not _STATE_CACHE["dirty"]:
+        _STATE_CACHE.update(path=filepath, mtime=mtime, data=state, version=_STATE_CACHE["version"] + 1)
+    return state
+
+
+def _encode_state(state) -> bytes:
+    """Serialize state to JSON bytes."""
+    if orjson:
+        # Note: orjson writes float("inf") as null; the tax calculator treats a null bracket max as unbounded
+        return orjson.dumps(state, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(state, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def _write_state_file(data: bytes, filepath):
+    """
+    Write encoded state to a temp file and rename it over `filepath`, so a crash never leaves a truncated file.
+    
+    Returns the new file's mtime.
+    """
+    tmp_path = filepath + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, filepath)
+    return os.stat(filepath).st_mtime_ns
 
 
 def save_state(state, filepath=STATE_FILE):
-    """Save state to JSON file."""
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(state, f, indent=2, ensure_ascii=False)
+    """
+    Save state to JSON file and refresh the in-memory cache.
+    
+    While the state writer task is running the write is deferred, so several
+    saves in quick succession reach the disk as one write.
+    """
+    if _STATE_CACHE["dirty"] and _STATE_CACHE["path"] != filepath:
+        flush_state()
+    _STATE_CACHE.update(path=filepath, data=state, dirty=True, version=_STATE_CACHE["version"] + 1)
+    
+    loop, event = _STATE_WRITER["loop"], _STATE_WRITER["event"]
+    if event is None:
+        flush_state()
+    else:
+        loop.call_soon_threadsafe(event.set)
+
+
+def flush_state():
+    """Write pending state changes to disk, if any."""
+    if not _STATE_CACHE["dirty"]:
+        return
+    mtime = _write_state_file(_encode_state(_STATE_CACHE["data"]), _STATE_CACHE["path"])
+    _STATE_CACHE.update(mtime=mtime, dirty=False)
+
+
+async def _flush_state_in_thread():
+    """
+    Like flush_state(), but the file write runs in a worker thread.
+    
+    The state is encoded on the event loop so handlers can't mutate it mid-dump.
+    If it is saved again while the write is in flight it stays dirty for the next flush.
+    """
+    if not _STATE_CACHE["dirty"]:
+        return
+    filepath, version = _STATE_CACHE["path"], _STATE_CACHE["version"]
+    mtime = await asyncio.to_thread(_write_state_file, _encode_state(_STATE_CACHE["data"]), filepath)
+    if _STATE_CACHE["version"] == version:
+        _STATE_CACHE.update(mtime=mtime, dirty=False)
+
+
+async def run_state_writer():
+    """
+    Write saved state to disk at most once per STATE_FLUSH_WINDOW, off the event loop.
+    
+    Runs until cancelled; pending changes are flushed on the way out.
+    """
+    event = asyncio.Event()
+    _STATE_WRITER.update(loop=asyncio.get_running_loop(), event=event)
+    try:
+        while True:
+            await event.wait()
+            await asyncio.sleep(STATE_FLUSH_WINDOW)
+            event.clear()
+            await _flush_state_in_thread()
+    finally:
+        _STATE_WRITER.update(loop=None, event=None)
+        flush_state()
+
+
+def get_state_version(state=None):
+    """
+    Get the version of the cached state.
+    
+    Returns None if `state` is given and is not the cached object (e.g. a copy),
+    since its contents can't be tracked.
+    """
+    if state is not None and state is not _STATE_CACHE["data"]:
+        return None
+    return _STATE_CACHE["version"]
 
 
 def ensure_state_exists():
@@ -145,80 +272,110 @@ def ensure_state_exists():
         print(f"Created new state file: {STATE_FILE}")
 
 
-def get_current_month():
-    """Get current month number (1-12), respecting simulation mode."""
-    state = load_state()
+def get_current_month(state=None):
+    """
+    Get current month number (1-12), respecting simulation mode.
+    
+    Pass the already-loaded `state` to skip looking it up again.
+    """
+    if state is None:
+        state = load_state()
     sim_month = state.get("simulation", {}).get("current_month")
     if sim_month is not None:
         return int(sim_month)
     return datetime.now().month
 
 
-def get_current_year():
-    """Get current year, respecting simulation mode."""
-    state = load_state()
+def get_current_year(state=None):
+    """
+    Get current year, respecting simulation mode.
+    
+    Pass the already-loaded `state` to skip looking it up again.
+    """
+    if state is None:
+        state = load_state()
     sim_year = state.get("simulation", {}).get("current_year")
     if sim_year is not None:
         return int(sim_year)
     return datetime.now().year
 
 
+def get_current_year_month(state=None):
+    """
+    Get the current (year, month) pair, respecting simulation mode.
+    
+    Same as calling get_current_year() and get_current_month(), with a single state lookup.
+    """
+    if state is None:
+        state = load_state()
+    return get_current_year(state), get_current_month(state)
+
+
 def get_currency_symbol():
     """Get currency symbol based on locale."""
     return "₪"
 
 
-def get_tz():
-    """Get timezone object."""
-    return pytz.timezone("Asia/Jerusalem")
+# Resolved once; pytz.timezone() looks the zone up on every call
+_TZ = pytz.timezone(get_env_value("TIMEZONE", "Asia/Jerusalem"))
 
 
-def get_current_year():
-    """Get current year."""
-    return datetime.now().year
+def get_tz():
+    """Get timezone object."""
+    return _TZ
 
 
 # ============================================================================
 # NEW: Organized folder structure helpers
 # ============================================================================
 
+# Directories already created by this process (skips a makedirs/stat per helper call)
+_CREATED_DIRS = set()
+
+
+def _ensure_dir(path: str) -> str:
+    """Create a directory once per process and return its path."""
+    if path not in _CREATED_DIRS:
+        os.makedirs(path, exist_ok=True)
+        _CREATED_DIRS.add(path)
+    return path
+
+
 def get_year_folder(year: int = None) -> str:
     """Get the folder path for a specific year."""
     if year is None:
         year = get_current_year()
     path = os.path.join(DATA_FOLDER_PATH, str(year))
-    os.makedirs(path, exist_ok=True)
-    return path
+    return _ensure_dir(path)
 
 
 def get_month_folder(year: int = None, month: int = None) -> str:
     """Get the folder path for a specific month."""
-    if year is None:
+    if year is None and month is None:
+        year, month = get_current_year_month()
+    elif year is None:
         year = get_current_year()
-    if month is None:
+    elif month is None:
         month = get_current_month()
     
     year_path = get_year_folder(year)
     month_str = f"{month:02d}"  # Format as 01, 02, ..., 12
     path = os.path.join(year_path, month_str)
-    os.makedirs(path, exist_ok=True)
-    return path
+    return _ensure_dir(path)
 
 
 def get_receipts_folder(year: int = None, month: int = None) -> str:
     """Get the receipts folder for a specific month."""
     month_path = get_month_folder(year, month)
     path = os.path.join(month_path, "receipts")
-    os.makedirs(path, exist_ok=True)
-    return path
+    return _ensure_dir(path)
 
 
 def get_expenses_folder(year: int = None, month: int = None) -> str:
     """Get the expenses folder for a specific month."""
     month_path = get_month_folder(year, month)
     path = os.path.join(month_path, "expenses")
-    os.makedirs(path, exist_ok=True)
-    return path
+    return _ensure_dir(path)
 
 
 def get_yearly_ledger_path(year: int = None) -> str:
@@ -231,9 +388,11 @@ def get_yearly_ledger_path(year: int = None) -> str:
 
 def get_monthly_ledger_path(year: int = None, month: int = None) -> str:
     """Get the monthly ledger file path."""
-    if year is None:
+    if year is None and month is None:
+        year, month = get_current_year_month()
+    elif year is None:
         year = get_current_year()
-    if month is None:
+    elif month is None:
         month = get_current_month()
     
     month_path = get_month_folder(year, month)
@@ -257,8 +416,7 @@ def get_invoices_folder(year: int = None, month: int = None) -> str:
     """Get the invoices folder for a specific month (receipts are income, invoices are for billing)."""
     month_path = get_month_folder(year, month)
     path = os.path.join(month_path, "invoices")
-    os.makedirs(path, exist_ok=True)
-    return path
+    return _ensure_dir(path)
 
 
 def get_invoice_path(invoice_id: str, year: int = None, month: int = None) -> str:
@@ -4,10 +4,19 @@ Calculates YTD aggregations, caps, remaining room, and recommendations.
 """
 
 from datetime import datetime
-from typing import Dict, Any
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+from typing import Dict, Any, Tuple
+import config
 from core import tax_calculator
 
 
+# Last full analysis, keyed by (state version, forecast mode, real month)
+_ANALYSIS_CACHE = {"key": None, "result": None}
+
+_AGORA = Decimal("0.01")
+
+
 def calculate_ytd_totals(state: Dict[str, Any]) -> Dict[str, float]:
     """
     Calculate year-to-date totals.
@@ -28,37 +37,63 @@ def calculate_ytd_totals(state: Dict[str, Any]) -> Dict[str, float]:
     sim_month = state.get("simulation", {}).get("current_month")
     current_month = sim_month if sim_month is not None else datetime.now().month
     
+    # Single pass: read each field once and accumulate into locals
+    income_ytd = expenses_ytd = pension_total = study_total = 0
+    months_with_data = 0  # Count of months with actual data
+    
+    for month_data in months_data.values():
+        income = month_data.get("income", 0)
+        expenses = month_data.get("expenses", 0)
+        pension = month_data.get("pension", 0)
+        study = month_data.get("study", 0)
+        
+        # Count months with any activity
+        if income > 0 or expenses > 0 or pension > 0 or study > 0:
+            months_with_data += 1
+        
+        income_ytd += income
+        expenses_ytd += expenses
+        pension_total += pension
+        study_total += study
+    
     totals = {
-        "income_ytd": 0,
-        "expenses_ytd": 0,
-        "pension_total": 0,
-        "study_total": 0,
+        "income_ytd": income_ytd,
+        "expenses_ytd": expenses_ytd,
+        "pension_total": pension_total,
+        "study_total": study_total,
         "months_left": 12 - current_month + 1,  # Including current month
-        "months_with_data": 0,  # Count of months with actual data
+        # If no months have data, default to 1 to avoid division by zero
+        "months_with_data": months_with_data or 1,
+        "net_income_ytd": income_ytd - expenses_ytd,
     }
     
-    for month_num, month_data in months_data.items():
-        # Count months with any activity
-        if (month_data.get("income", 0) > 0 or 
-            month_data.get("expenses", 0) > 0 or 
-            month_data.get("pension", 0) > 0 or 
-            month_data.get("study", 0) > 0):
-            totals["months_with_data"] += 1
-            
-        totals["income_ytd"] += month_data.get("income", 0)
-        totals["expenses_ytd"] += month_data.get("expenses", 0)
-        totals["pension_total"] += month_data.get("pension", 0)
-        totals["study_total"] += month_data.get("study", 0)
-    
-    totals["net_income_ytd"] = totals["income_ytd"] - totals["expenses_ytd"]
-    
-    # If no months have data, default to 1 to avoid division by zero
-    if totals["months_with_data"] == 0:
-        totals["months_with_data"] = 1
-    
     return totals
 
 
+@lru_cache(maxsize=None)
+def _vat_exclusion_factor(vat_rate: float) -> Decimal:
+    """1 / (1 + vat_rate), computed once per rate."""
+    return 1 / (1 + Decimal(str(vat_rate)))
+
+
+def split_vat(amount: float, vat_rate: float) -> Tuple[float, float]:
+    """
+    Split a VAT-inclusive amount into its net part and the VAT in it.
+    
+    The math is done in Decimal and the net part rounded to agorot, so the
+    two parts always add back up to `amount`.
+    
+    Returns:
+        (amount excluding VAT, VAT amount); (amount, 0.0) if vat_rate is 0
+    """
+    if vat_rate <= 0:
+        return amount, 0.0
+    
+    amount_d = Decimal(str(amount))
+    amount_excl_vat = (amount_d * _vat_exclusion_factor(vat_rate)).quantize(_AGORA, rounding=ROUND_HALF_UP)
+    return float(amount_excl_vat), float(amount_d - amount_excl_vat)
+
+
 def calculate_caps(net_income_ytd: float, settings: Dict[str, Any]) -> Dict[str, float]:
     """
     Calculate deductible caps based on net income.
@@ -96,17 +131,15 @@ def calculate_remaining_room(
             "study_total_remaining": float
         }
     """
-    pension_deductible_deposited = min(pension_total, caps["pension_cap"])
-    
-    # Study fund: what's deductible vs non-deductible
-    study_deductible_deposited = min(study_total, caps["study_deductible_cap"])
+    # Conditional expressions instead of max(0, ...): this runs on every analysis
+    pension_remaining = caps["pension_cap"] - pension_total
+    study_deductible_remaining = caps["study_deductible_cap"] - study_total
+    study_total_remaining = caps["study_total_cap"] - study_total
     
     return {
-        "pension_remaining": max(0, caps["pension_cap"] - pension_total),
-        "study_deductible_remaining": max(
-            0, caps["study_deductible_cap"] - study_total
-        ),
-        "study_total_remaining": max(0, caps["study_total_cap"] - study_total),
+        "pension_remaining": pension_remaining if pension_remaining > 0 else 0,
+        "study_deductible_remaining": study_deductible_remaining if study_deductible_remaining > 0 else 0,
+        "study_total_remaining": study_total_remaining if study_total_remaining > 0 else 0,
     }
 
 
@@ -179,14 +212,23 @@ def calculate_deductible_analysis(
             }
         }
     """
-    pension_deductible = min(pension_total, caps["pension_cap"])
-    pension_non_deductible = max(0, pension_total - caps["pension_cap"])
+    pension_cap = caps["pension_cap"]
+    study_deductible_cap = caps["study_deductible_cap"]
     
-    study_deductible = min(study_total, caps["study_deductible_cap"])
-    study_non_deductible_portion = max(0, study_total - caps["study_deductible_cap"])
+    pension_deductible = pension_total if pension_total <= pension_cap else pension_cap
+    pension_non_deductible = pension_total - pension_cap if pension_total > pension_cap else 0
+    
+    study_deductible = study_total if study_total <= study_deductible_cap else study_deductible_cap
+    study_non_deductible_portion = study_total - study_deductible_cap if study_total > study_deductible_cap else 0
     # Tax-free portion: up to the total cap minus deductible cap (₪20,520 - deductible_cap)
-    max_tax_free_allowed = max(0, caps["study_total_cap"] - caps["study_deductible_cap"])
-    study_non_deductible_tax_free = min(study_non_deductible_portion, max_tax_free_allowed)
+    max_tax_free_allowed = caps["study_total_cap"] - study_deductible_cap
+    if max_tax_free_allowed < 0:
+        max_tax_free_allowed = 0
+    study_non_deductible_tax_free = (
+        study_non_deductible_portion
+        if study_non_deductible_portion <= max_tax_free_allowed
+        else max_tax_free_allowed
+    )
     
     return {
         "pension": {
@@ -206,8 +248,26 @@ def calculate_full_analysis(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Complete analysis calculation pipeline.
     
+    Results for the cached state are memoized until the state is saved or reloaded;
+    the returned dict is shared and must not be mutated.
+    
     Returns a comprehensive dictionary with all calculations.
     """
+    version = config.get_state_version(state)
+    if version is not None:
+        # The real month is part of the key because months_left follows the clock outside simulation mode
+        key = (version, state["settings"].get("forecast", {}).get("mode", "balanced"), datetime.now().month)
+        if _ANALYSIS_CACHE["key"] == key:
+            return _ANALYSIS_CACHE["result"]
+    
+    analysis = _calculate_full_analysis(state)
+    if version is not None:
+        _ANALYSIS_CACHE.update(key=key, result=analysis)
+    return analysis
+
+
+def _calculate_full_analysis(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Run the full analysis pipeline without caching."""
     totals = calculate_ytd_totals(state)
     caps = calculate_caps(totals["net_income_ytd"], state["settings"])
     remaining = calculate_remaining_room(caps, totals["pension_total"], totals["study_total"])
@@ -234,7 +294,8 @@ def calculate_full_analysis(state: Dict[str, Any]) -> Dict[str, Any]:
         taxable_income_ytd,  # Use taxable income, not net income!
         tax_settings, 
         ni_settings,
-        totals["months_with_data"]
+        totals["months_with_data"],
+        with_breakdown=False,  # no reply renders the per-bracket rows
     )
     
     return {
@@ -3,11 +3,162 @@ Tax and National Insurance calculation engine for self-employed (osek patur).
 Self-employed individuals only pay employee NI + Health (no employer contributions).
 """
 
-from typing import Dict, Any, List
+from bisect import bisect_left
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Any, List, NamedTuple, Tuple, Union
+
+
+class TaxBracketRow(NamedTuple):
+    """One row of an income tax breakdown."""
+    bracket_min: float
+    bracket_max: float  # inf = unbounded
+    rate: float
+    amount: float
+    surtax: bool = False
+
+
+class NIBracketRow(NamedTuple):
+    """One row of a National Insurance breakdown."""
+    bracket_min: float
+    bracket_max: float  # inf = unbounded
+    ni_rate: float
+    health_rate: float
+    ni_amount: float
+    health_amount: float
+    total_amount: float
+
+
+# Result for months with no income yet: nothing is owed whatever the settings
+_ZERO_NI_RESULT = {
+    "ni_amount": 0,
+    "health_amount": 0,
+    "total_amount": 0,
+    "effective_rate": 0,
+    "breakdown": [],
+}
+
+def _prepare_bracket_table(brackets: List[Dict[str, Any]]) -> Tuple[tuple, tuple, tuple, tuple, tuple]:
+    """
+    Flatten tax brackets into parallel tuples, cached by the bracket values.
+    
+    Returns:
+        (mins, maxs, rates, bracket_tax, base_tax) where bracket_tax[i] is the tax
+        on the whole of bracket i and base_tax[i] is the tax owed on all income
+        below mins[i] (the cumulative tax of the lower brackets)
+    """
+    return _bracket_table(tuple((b["min"], b["max"], b["rate"]) for b in brackets))
+
+
+@lru_cache(maxsize=16)
+def _bracket_table(brackets: Tuple[tuple, ...]) -> Tuple[tuple, tuple, tuple, tuple, tuple]:
+    """Build the bracket table from (min, max, rate) tuples (see _prepare_bracket_table)."""
+    mins, maxs, rates, bracket_tax, base_tax = [], [], [], [], []
+    cumulative_tax = 0
+    for bracket_min, bracket_max, rate in brackets:
+        if bracket_max is None:
+            bracket_max = float("inf")  # null = unbounded
+        mins.append(bracket_min)
+        maxs.append(bracket_max)
+        rates.append(rate)
+        bracket_tax.append((bracket_max - bracket_min) * rate)
+        base_tax.append(cumulative_tax)
+        cumulative_tax += bracket_tax[-1]
+    
+    return (tuple(mins), tuple(maxs), tuple(rates), tuple(bracket_tax), tuple(base_tax))
+
+
+@lru_cache(maxsize=16)
+def _prepare_ni_table(
+    low_threshold: float,
+    high_threshold: float,
+    ni_low_rate: float,
+    health_low_rate: float,
+    ni_high_rate: float,
+    health_high_rate: float,
+) -> Tuple[tuple, tuple, tuple, tuple, tuple, tuple]:
+    """
+    Build the NI/health piecewise-linear table for segments (0, low], (low, high], (high, inf).
+    
+    Returns:
+        (breaks, caps, ni_rates, health_rates, ni_base, health_base) in the same layout
+        as the income tax bracket table (base = amount owed below the segment)
+    """
+    ni_low_full = low_threshold * ni_low_rate
+    health_low_full = low_threshold * health_low_rate
+    return (
+        (0, low_threshold, high_threshold),
+        (low_threshold, high_threshold, float("inf")),
+        (ni_low_rate, ni_high_rate, 0),
+        (health_low_rate, health_high_rate, 0),
+        (0, ni_low_full, ni_low_full + (high_threshold - low_threshold) * ni_high_rate),
+        (0, health_low_full, health_low_full + (high_threshold - low_threshold) * health_high_rate),
+    )
+
+
+def _eval_piecewise(
+    x: float, breaks: tuple, caps: tuple, slopes: tuple, intercepts: tuple
+) -> Tuple[int, float]:
+    """
+    Evaluate a piecewise-linear schedule (tax brackets, NI segments) at x.
+    
+    Segment i starts at breaks[i] with value intercepts[i] and grows by slopes[i]
+    up to caps[i].
+    
+    Returns:
+        (i, value) where i is the segment x falls in (-1 and 0 if x <= breaks[0])
+    """
+    i = bisect_left(breaks, x) - 1
+    if i < 0:
+        return i, 0
+    return i, intercepts[i] + (min(x, caps[i]) - breaks[i]) * slopes[i]
+
+
+@dataclass(frozen=True)
+class TaxSettings:
+    """
+    Income tax settings resolved from the settings dict.
+    
+    Immutable and hashable; resolve once with from_dict() and pass it instead of
+    the dict to skip the per-call lookups (e.g. in loops over many incomes).
+    """
+    bracket_table: Tuple[tuple, tuple, tuple, tuple, tuple]
+    credit_points_value: float
+    surtax_threshold: float
+    surtax_rate: float
+    
+    @classmethod
+    def from_dict(cls, tax_settings: Dict[str, Any]) -> "TaxSettings":
+        return cls(
+            _prepare_bracket_table(tax_settings.get("brackets", [])),
+            tax_settings.get("credit_points", 2.25) * tax_settings.get("credit_point_value", 2800),
+            tax_settings.get("surtax_threshold", 721560),
+            tax_settings.get("surtax_rate", 0.03),
+        )
+
+
+@dataclass(frozen=True)
+class NISettings:
+    """National Insurance settings resolved from the settings dict (see TaxSettings)."""
+    table: Tuple[tuple, tuple, tuple, tuple, tuple, tuple]
+    
+    @classmethod
+    def from_dict(cls, ni_settings: Dict[str, Any]) -> "NISettings":
+        thresholds = ni_settings.get("monthly_thresholds", {})
+        rates = ni_settings.get("rates", {})
+        return cls(_prepare_ni_table(
+            thresholds.get("low", 7522),
+            thresholds.get("high", 50695),
+            # Self-employed rates (employee portion only)
+            rates.get("ni_low", 0.0104),  # 1.04%
+            rates.get("health_low", 0.0323),  # 3.23%
+            rates.get("ni_high", 0.07),  # 7%
+            rates.get("health_high", 0.0516),  # 5.16%
+        ))
 
 
 def calculate_national_insurance(
-    monthly_income: float, ni_settings: Dict[str, Any]
+    monthly_income: float, ni_settings: Union[NISettings, Dict[str, Any]], with_breakdown: bool = True
 ) -> Dict[str, Any]:
     """
     Calculate National Insurance and Health Tax for self-employed (osek patur).
@@ -15,7 +166,8 @@ def calculate_national_insurance(
     
     Args:
         monthly_income: Monthly income (not annual)
-        ni_settings: NI configuration from settings
+        ni_settings: NI configuration from settings (dict or NISettings)
+        with_breakdown: Build the per-bracket breakdown (an empty list otherwise)
     
     Returns:
         {
@@ -23,78 +175,47 @@ def calculate_national_insurance(
             "health_amount": float,
             "total_amount": float,
             "effective_rate": float,
-            "breakdown": List[Dict]
+            "breakdown": List[NIBracketRow]
         }
-    """
-    thresholds = ni_settings.get("monthly_thresholds", {})
-    rates = ni_settings.get("rates", {})
     
-    low_threshold = thresholds.get("low", 7522)
-    high_threshold = thresholds.get("high", 50695)
+    Results are cached and shared between callers, so they must not be mutated.
+    """
+    if monthly_income <= 0:
+        return _ZERO_NI_RESULT
     
-    # Self-employed rates (employee portion only)
-    ni_low_rate = rates.get("ni_low", 0.0104)  # 1.04%
-    health_low_rate = rates.get("health_low", 0.0323)  # 3.23%
-    ni_high_rate = rates.get("ni_high", 0.07)  # 7%
-    health_high_rate = rates.get("health_high", 0.0516)  # 5.16%
+    if not isinstance(ni_settings, NISettings):
+        ni_settings = NISettings.from_dict(ni_settings)
+    return _calculate_national_insurance(monthly_income, ni_settings, with_breakdown)
+
+
+@lru_cache(maxsize=1024)
+def _calculate_national_insurance(
+    monthly_income: float,
+    ni_settings: NISettings,
+    with_breakdown: bool,
+) -> Dict[str, Any]:
+    """Cached body of calculate_national_insurance, keyed on income and the resolved settings."""
+    breaks, caps, ni_rates, health_rates, ni_base, health_base = ni_settings.table
+    segment, ni_amount = _eval_piecewise(monthly_income, breaks, caps, ni_rates, ni_base)
+    _, health_amount = _eval_piecewise(monthly_income, breaks, caps, health_rates, health_base)
     
-    # Initialize calculations
-    ni_amount = 0
-    health_amount = 0
     breakdown = []
-    
-    # Calculate for income up to low threshold
-    if monthly_income > 0:
-        income_in_low_bracket = min(monthly_income, low_threshold)
-        
-        # Self-employed contributions (low bracket)
-        ni_low_amount = income_in_low_bracket * ni_low_rate
-        health_low_amount = income_in_low_bracket * health_low_rate
-        
-        ni_amount += ni_low_amount
-        health_amount += health_low_amount
-        
-        if ni_low_amount > 0 or health_low_amount > 0:
-            breakdown.append({
-                "bracket": f"₪0 - ₪{low_threshold:,.0f}",
-                "ni_rate": f"{ni_low_rate*100:.2f}%",
-                "health_rate": f"{health_low_rate*100:.2f}%",
-                "ni_amount": ni_low_amount,
-                "health_amount": health_low_amount,
-                "total_amount": ni_low_amount + health_low_amount,
-            })
-    
-    # Calculate for income between low and high thresholds
-    if monthly_income > low_threshold:
-        income_in_high_bracket = min(monthly_income, high_threshold) - low_threshold
-        
-        # Self-employed contributions (high bracket)
-        ni_high_amount = income_in_high_bracket * ni_high_rate
-        health_high_amount = income_in_high_bracket * health_high_rate
+    for i in range(segment + 1 if with_breakdown else 0):
+        income_in_bracket = min(monthly_income, caps[i]) - breaks[i]
+        ni_part = income_in_bracket * ni_rates[i]
+        health_part = income_in_bracket * health_rates[i]
         
-        ni_amount += ni_high_amount
-        health_amount += health_high_amount
-        
-        if ni_high_amount > 0 or health_high_amount > 0:
-            breakdown.append({
-                "bracket": f"₪{low_threshold:,.0f} - ₪{high_threshold:,.0f}",
-                "ni_rate": f"{ni_high_rate*100:.1f}%",
-                "health_rate": f"{health_high_rate*100:.2f}%",
-                "ni_amount": ni_high_amount,
-                "health_amount": health_high_amount,
-                "total_amount": ni_high_amount + health_high_amount,
-            })
-    
-    # Income above high threshold (no additional contributions)
-    if monthly_income > high_threshold:
-        breakdown.append({
-            "bracket": f"₪{high_threshold:,.0f}+",
-            "ni_rate": "0.00%",
-            "health_rate": "0.00%",
-            "ni_amount": 0,
-            "health_amount": 0,
-            "total_amount": 0,
-        })
+        # Income above the high threshold is listed even though nothing more is owed on it
+        if ni_part > 0 or health_part > 0 or i == len(breaks) - 1:
+            breakdown.append(NIBracketRow(
+                bracket_min=breaks[i],
+                bracket_max=caps[i],
+                ni_rate=ni_rates[i],
+                health_rate=health_rates[i],
+                ni_amount=ni_part,
+                health_amount=health_part,
+                total_amount=ni_part + health_part,
+            ))
     
     # Calculate totals (self-employed only pay NI + Health, no employer portion)
     total_amount = ni_amount + health_amount
@@ -110,14 +231,15 @@ def calculate_national_insurance(
 
 
 def calculate_income_tax(
-    income: float, tax_settings: Dict[str, Any]
+    income: float, tax_settings: Union[TaxSettings, Dict[str, Any]], with_breakdown: bool = True
 ) -> Dict[str, Any]:
     """
     Calculate income tax with progressive brackets and surtax.
     
     Args:
         income: Taxable income
-        tax_settings: Tax configuration from settings
+        tax_settings: Tax configuration from settings (dict or TaxSettings)
+        with_breakdown: Build the per-bracket breakdown (an empty list otherwise)
     
     Returns:
         {
@@ -127,78 +249,173 @@ def calculate_income_tax(
             "credit_points_value": float,
             "net_tax": float,
             "surtax": float,
-            "breakdown": List[Dict]
+            "breakdown": List[TaxBracketRow]
         }
+    
+    Results are cached and shared between callers, so they must not be mutated.
+    """
+    if not isinstance(tax_settings, TaxSettings):
+        tax_settings = TaxSettings.from_dict(tax_settings)
+    return _calculate_income_tax(income, tax_settings, with_breakdown)
+
+
+def _income_tax_kernel(
+    income: float,
+    bracket_table: Tuple[tuple, tuple, tuple, tuple, tuple],
+    credit_points_value: float,
+    surtax_threshold: float,
+    surtax_rate: float,
+) -> Tuple[int, float, float, float, float]:
     """
-    brackets = tax_settings.get("brackets", [])
-    credit_points = tax_settings.get("credit_points", 2.25)
-    credit_point_value = tax_settings.get("credit_point_value", 2800)
-    surtax_threshold = tax_settings.get("surtax_threshold", 721560)
-    surtax_rate = tax_settings.get("surtax_rate", 0.03)
+    Scalar income tax arithmetic (no breakdown, no allocations besides the result tuple).
     
-    total_tax = 0
-    breakdown = []
+    Returns:
+        (top, total_tax, surtax, net_tax, marginal_rate) where top is the index of the
+        highest bracket reached (-1 if none) and total_tax includes the surtax
+    """
+    mins, maxs, rates, _, base_tax = bracket_table
     
-    for bracket in brackets:
-        bracket_min = bracket["min"]
-        bracket_max = bracket["max"]
-        bracket_rate = bracket["rate"]
-        
-        if income <= bracket_min:
-            break
-        
-        taxable_in_bracket = min(income, bracket_max) - bracket_min
-        tax_in_bracket = taxable_in_bracket * bracket_rate
-        total_tax += tax_in_bracket
-        
-        if tax_in_bracket > 0:
-            breakdown.append({
-                "bracket": f"₪{bracket_min:,.0f} - ₪{bracket_max:,.0f}",
-                "rate": f"{bracket_rate*100:.1f}%",
-                "amount": tax_in_bracket,
-            })
+    # top = highest bracket the income reaches (income > its min), -1 if none
+    top, total_tax = _eval_piecewise(income, mins, maxs, rates, base_tax)
+    # Marginal rate is the rate of the highest bracket reached
+    marginal_rate = rates[top] if top >= 0 else 0
     
     # Calculate surtax (3% on income above 721,560 ILS)
     surtax = 0
     if income > surtax_threshold:
         surtax = (income - surtax_threshold) * surtax_rate
-        breakdown.append({
-            "bracket": f"₪{surtax_threshold:,.0f}+ (Surtax)",
-            "rate": f"{surtax_rate*100:.1f}%",
-            "amount": surtax,
-        })
-    
-    total_tax_with_surtax = total_tax + surtax
-    
-    credit_points_value_calc = credit_points * credit_point_value
-    net_tax = max(0, total_tax_with_surtax - credit_points_value_calc)
-    
-    # Determine marginal rate (highest bracket reached)
-    marginal_rate = 0
-    for bracket in brackets:
-        if income > bracket["min"]:
-            marginal_rate = bracket["rate"]
-    if income > surtax_threshold:
         marginal_rate += surtax_rate
     
+    total_tax += surtax
+    net_tax = total_tax - credit_points_value
+    if net_tax < 0:
+        net_tax = 0
+    return top, total_tax, surtax, net_tax, marginal_rate
+
+
+@lru_cache(maxsize=1024)
+def _calculate_income_tax(
+    income: float,
+    tax_settings: TaxSettings,
+    with_breakdown: bool,
+) -> Dict[str, Any]:
+    """Cached body of calculate_income_tax, keyed on income and the resolved settings."""
+    credit_points_value = tax_settings.credit_points_value
+    surtax_threshold = tax_settings.surtax_threshold
+    surtax_rate = tax_settings.surtax_rate
+    top, total_tax_with_surtax, surtax, net_tax, marginal_rate = _income_tax_kernel(
+        income, tax_settings.bracket_table, credit_points_value, surtax_threshold, surtax_rate
+    )
+    
+    mins, maxs, rates, bracket_tax, _ = tax_settings.bracket_table
+    breakdown = []
+    for i in range(top + 1 if with_breakdown else 0):
+        bracket_min = mins[i]
+        bracket_max = maxs[i]
+        bracket_rate = rates[i]
+        # Brackets below the top one are fully used
+        tax_in_bracket = bracket_tax[i] if i < top else (min(income, bracket_max) - bracket_min) * bracket_rate
+        
+        if tax_in_bracket > 0:
+            breakdown.append(TaxBracketRow(
+                bracket_min=bracket_min,
+                bracket_max=bracket_max,
+                rate=bracket_rate,
+                amount=tax_in_bracket,
+            ))
+    
+    if with_breakdown and income > surtax_threshold:
+        breakdown.append(TaxBracketRow(
+            bracket_min=surtax_threshold,
+            bracket_max=float("inf"),
+            rate=surtax_rate,
+            amount=surtax,
+            surtax=True,
+        ))
+    
     effective_rate = net_tax / income if income > 0 else 0
     
     return {
         "amount": total_tax_with_surtax,
         "marginal_rate": marginal_rate,
         "effective_rate": effective_rate,
-        "credit_points_value": credit_points_value_calc,
+        "credit_points_value": credit_points_value,
         "net_tax": net_tax,
         "surtax": surtax,
         "breakdown": breakdown,
     }
 
 
+def calculate_income_tax_batch(incomes, tax_settings: Union[TaxSettings, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Calculate income tax for many incomes at once (e.g. projection sweeps or rate curves).
+    
+    Same arithmetic as calculate_income_tax, vectorized with NumPy and without breakdowns.
+    
+    Args:
+        incomes: Taxable incomes (a sequence, 1-D NumPy array, or a single number)
+        tax_settings: Tax configuration from settings (dict or TaxSettings)
+    
+    Returns (arrays are 1-D, one entry per income):
+        {
+            "amount": ndarray,
+            "marginal_rate": ndarray,
+            "effective_rate": ndarray,
+            "credit_points_value": float,
+            "net_tax": ndarray,
+            "surtax": ndarray
+        }
+    """
+    import numpy as np
+    
+    if not isinstance(tax_settings, TaxSettings):
+        tax_settings = TaxSettings.from_dict(tax_settings)
+    mins, maxs, rates, _, _ = tax_settings.bracket_table
+    mins = np.asarray(mins, dtype=float)
+    maxs = np.asarray(maxs, dtype=float)
+    rates = np.asarray(rates, dtype=float)
+    credit_points_value = tax_settings.credit_points_value
+    surtax_threshold = tax_settings.surtax_threshold
+    surtax_rate = tax_settings.surtax_rate
+    
+    # A single income is treated as a batch of one
+    incomes = np.atleast_1d(np.asarray(incomes, dtype=float))
+    
+    # Income falling in each bracket: one row per income, one column per bracket
+    taxable = np.clip(incomes[:, None] - mins, 0, maxs - mins)
+    total_tax = taxable @ rates
+    
+    above_surtax = incomes > surtax_threshold
+    surtax = np.where(above_surtax, (incomes - surtax_threshold) * surtax_rate, 0.0)
+    amount = total_tax + surtax
+    net_tax = np.maximum(amount - credit_points_value, 0.0)
+    
+    # Highest bracket reached (income > its min), as in bisect_left
+    top = np.searchsorted(mins, incomes, side="left") - 1
+    if rates.size:
+        bracket_rate = np.where(top >= 0, rates[np.maximum(top, 0)], 0.0)
+    else:
+        bracket_rate = np.zeros_like(incomes)  # No brackets configured
+    marginal_rate = bracket_rate + np.where(above_surtax, surtax_rate, 0.0)
+    effective_rate = np.divide(net_tax, incomes, out=np.zeros_like(net_tax), where=incomes > 0)
+    
+    return {
+        "amount": amount,
+        "marginal_rate": marginal_rate,
+        "effective_rate": effective_rate,
+        "credit_points_value": credit_points_value,
+        "net_tax": net_tax,
+        "surtax": surtax,
+    }
+
+
 def calculate_comprehensive_tax_analysis(
     net_income: float, 
-    tax_settings: Dict[str, Any], 
-    ni_settings: Dict[str, Any],
-    months_with_data: int = 12
+    tax_settings: Union[TaxSettings, Dict[str, Any]], 
+    ni_settings: Union[NISettings, Dict[str, Any]],
+    months_with_data: int = 12,
+    ni_paid_manually: float = 0,
+    with_breakdown: bool = True,
 ) -> Dict[str, Any]:
     """
     Calculate comprehensive tax analysis for self-employed (osek patur).
@@ -208,21 +425,26 @@ def calculate_comprehensive_tax_analysis(
         tax_settings: Tax configuration
         ni_settings: National Insurance configuration
         months_with_data: Number of months with actual financial data
+            (12 = net_income already covers a full year)
+        ni_paid_manually: Amount of NI already paid manually (annual)
+        with_breakdown: Include the per-bracket tax and NI breakdowns
     
     Returns:
         Comprehensive tax analysis with all calculations
     """
-    # Calculate monthly TAXABLE income from YTD
-    monthly_taxable_income = net_income / months_with_data if months_with_data > 0 else 0
-    
-    # Project to annual income (for tax calculation)
-    annual_income_projection = monthly_taxable_income * 12
+    if months_with_data != 12:
+        # Calculate monthly TAXABLE income from YTD and project it to a full year
+        monthly_taxable_income = net_income / months_with_data if months_with_data > 0 else 0
+        annual_income_projection = monthly_taxable_income * 12
+    else:
+        annual_income_projection = net_income
+        monthly_taxable_income = net_income / 12
     
     # Calculate taxes on projected annual TAXABLE income
-    tax_calc = calculate_income_tax(annual_income_projection, tax_settings)
+    tax_calc = calculate_income_tax(annual_income_projection, tax_settings, with_breakdown)
     
     # Calculate NI on monthly TAXABLE income - self-employed only
-    ni_calc_monthly = calculate_national_insurance(monthly_taxable_income, ni_settings)
+    ni_calc_monthly = calculate_national_insurance(monthly_taxable_income, ni_settings, with_breakdown)
     
     # Monthly amounts (what you owe THIS month)
     monthly_ni = ni_calc_monthly["ni_amount"]
@@ -245,6 +467,12 @@ def calculate_comprehensive_tax_analysis(
     total_effective_rate = total_tax_burden / annual_income_projection if annual_income_projection > 0 else 0
     take_home_pay = annual_income_projection - total_tax_burden
     
+    # NI payment analysis
+    ni_remaining = max(0, ni_total_annual - ni_paid_manually)
+    ni_overpaid = max(0, ni_paid_manually - ni_total_annual)
+    monthly_ni_paid = ni_paid_manually / 12
+    monthly_ni_remaining = ni_remaining / 12
+    
     # Create summary comparison
     summary_comparison = {
         "yearly": {
@@ -263,6 +491,15 @@ def calculate_comprehensive_tax_analysis(
             "take_home": monthly_take_home,
             "effective_rate": monthly_tax_burden / monthly_taxable_income if monthly_taxable_income > 0 else 0,
         },
+        "ni_status": {
+            "yearly_paid": ni_paid_manually,
+            "yearly_due": ni_total_annual,
+            "yearly_remaining": ni_remaining,
+            "yearly_overpaid": ni_overpaid,
+            "monthly_paid": monthly_ni_paid,
+            "monthly_due": monthly_ni_total,
+            "monthly_remaining": monthly_ni_remaining,
+        },
     }
     
     # Calculate percentages for summary
@@ -295,6 +532,11 @@ def calculate_comprehensive_tax_analysis(
             "monthly_total": monthly_ni_total,
             "effective_rate": ni_calc_monthly["effective_rate"],
             "breakdown": ni_calc_monthly["breakdown"],
+            "paid_manually": ni_paid_manually,
+            "monthly_paid": monthly_ni_paid,
+            "remaining": ni_remaining,
+            "monthly_remaining": monthly_ni_remaining,
+            "overpaid": ni_overpaid,
         },
         "summary": {
             "total_tax_burden": total_tax_burden,
@@ -308,4 +550,3 @@ def calculate_comprehensive_tax_analysis(
         },
         "comparison": summary_comparison,
     }
-
@@ -1,18 +1,45 @@
-import sys
-from pathlib import Path
-sys.path.append(str(Path(__file__).parent.parent))
-
+import asyncio
 import os
 import re
+from pathlib import Path
 
 from telegram import Update
 from telegram.ext import ContextTypes
-from config import DATA_FOLDER_PATH, get_current_month
 import config
-from services import ledger_service
 from core.calculator import calculate_ytd_totals
 
 
+# Document IDs in captions, e.g. "📄 Receipt K-2025-0001" (K = receipt, R = invoice, E = expense)
+_DOC_ID_RE = re.compile(r'([KRE]-\d{4}-\d{4})')
+
+# Unanswered previews kept per chat; the oldest is dropped beyond this (approving it then reports it expired)
+_MAX_PENDING_DOCUMENTS = 10
+
+
+def approve_callback_data(document_id: str, amount: float, client: str) -> str:
+    """
+    Build the callback data for an "Approve" button: approve|{document_id}|{amount}|{client}.
+    
+    The client goes last, so a "|" in the name still parses.
+    """
+    return "|".join(("approve", document_id, format(amount, ".2f"), client))
+
+
+def stash_pending_document(context: ContextTypes.DEFAULT_TYPE, document_id: str, pdf_path: str, pdf_bytes: bytes, year: int, month: int):
+    """
+    Keep a rendered receipt/invoice preview in memory until it is approved or cancelled.
+    
+    The year and month it was generated for are kept with it, so approval files it under
+    the same month even if the (simulated) month changes in between.
+    """
+    pending = context.chat_data.setdefault('pending_documents', {})
+    pending.pop(document_id, None)
+    pending[document_id] = (pdf_path, pdf_bytes, year, month)
+    while len(pending) > _MAX_PENDING_DOCUMENTS:
+        # Dicts keep insertion order, so the first key is the oldest preview
+        del pending[next(iter(pending))]
+
+
 async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle all callback queries."""
     query = update.callback_query
@@ -25,63 +52,62 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # The document should be in the same message
         if query.message.caption:
             # Extract ID from caption like "📄 Receipt K-2025-0001"
-            match = re.search(r'(K-\d{4}-\d{4}|R-\d{4}-\d{4}|E-\d{4}-\d{4})', query.message.caption)
+            match = _DOC_ID_RE.search(query.message.caption)
             if match:
-                doc_id = match.group(1)
-                # Determine folder based on prefix
-                if doc_id.startswith('K-'):
-                    folder = os.path.join(DATA_FOLDER_PATH, "receipts")
-                elif doc_id.startswith('R-'):
-                    folder = os.path.join(DATA_FOLDER_PATH, "invoices")
-                elif doc_id.startswith('E-'):
-                    folder = os.path.join(DATA_FOLDER_PATH, "expenses")
-                else:
-                    folder = None
-                
-                # Delete the file
-                if folder:
-                    file_path = os.path.join(folder, f"{doc_id}.pdf")
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
+                # Receipts and invoices awaiting approval are only held in memory, so dropping
+                # the pending entry is all there is to do (nothing was written to disk)
+                context.chat_data.get('pending_documents', {}).pop(match.group(1), None)
         
         await query.edit_message_caption(caption="❌ Cancelled and deleted")
         return
     
-    if data.startswith("approve_"):
-        # Parse approval data: approve_{invoice_id}_{amount}_{client}_{description}
-        parts = data.replace("approve_", "").split("_")
+    if data.startswith("approve|"):
+        _, invoice_id, amount, client = data.split("|", 3)
+        await handle_invoice_approval(query, context, invoice_id, float(amount), client, "Services")
+    
+    elif data.startswith("approve_"):
+        # Buttons sent before the "|" format: approve_{invoice_id}_{amount}_{client}_{description}
+        # (maxsplit keeps underscores inside the description intact)
+        parts = data[len("approve_"):].split("_", 3)
         if len(parts) >= 3:
             invoice_id = parts[0]
             amount = float(parts[1])
             client = parts[2]
-            description = "_".join(parts[3:]) if len(parts) > 3 else "Services"
+            description = parts[3] if len(parts) > 3 else "Services"
             
-            await handle_invoice_approval(query, invoice_id, amount, client, description)
+            await handle_invoice_approval(query, context, invoice_id, amount, client, description)
     
     # Add more callback handlers as needed
 
 
-async def handle_invoice_approval(query, document_id: str, amount: float, client: str, description: str):
+async def handle_invoice_approval(query, context: ContextTypes.DEFAULT_TYPE, document_id: str, amount: float, client: str, description: str):
     """Handle invoice/receipt approval and Drive upload."""
-    state = config.load_state()
-    
     # Determine if this is a receipt (K-) or invoice (R-)
     is_receipt = document_id.startswith('K-')
     counter_field = "next_receipt" if is_receipt else "next_invoice"
     
-    # Get current year and month
-    current_year = config.get_current_year()
-    current_month = config.get_current_month()
-    
-    # Get PDF path using new organized structure
-    if is_receipt:
-        pdf_path = config.get_receipt_path(document_id, current_year, current_month)
+    # Receipts and invoices are rendered in memory and written here, on approval,
+    # under the month they were generated for
+    pending = context.chat_data.get('pending_documents', {}).pop(document_id, None)
+    if pending:
+        pdf_path, pdf_bytes, current_year, current_month = pending
+        await asyncio.to_thread(Path(pdf_path).write_bytes, pdf_bytes)
     else:
-        pdf_path = config.get_invoice_path(document_id, current_year, current_month)
+        # Pending documents don't survive a bot restart; only a PDF already on disk can be approved
+        current_year, current_month = config.get_current_year_month()
+        if is_receipt:
+            pdf_path = config.get_receipt_path(document_id, current_year, current_month)
+        else:
+            pdf_path = config.get_invoice_path(document_id, current_year, current_month)
+        if not os.path.exists(pdf_path):
+            await query.edit_message_caption(caption="⚠️ This preview has expired. Please create it again.")
+            return
     
     # Add to both monthly and yearly ledgers
+    from services import ledger_service
     ledger = ledger_service.LedgerService()
-    ledger.add_entry_to_all_ledgers(
+    await asyncio.to_thread(
+        ledger.add_entry_to_all_ledgers,
         entry_id=document_id,
         entry_type="Income",
         amount=amount,
@@ -96,18 +122,21 @@ async def handle_invoice_approval(query, document_id: str, amount: float, client
         month=current_month,
     )
     
+    # Load state only after the ledger write, so the read-modify-write below has no await in it
+    # and can't interleave with another update handled concurrently
+    state = config.load_state()
+    
     # Increment appropriate counter
     state['settings']['invoice_numbering'][counter_field] += 1
-    config.save_state(state)
     
-    # Update income for current month
-    current_month = get_current_month()
+    # Update income for current month (same month the ledger entry was filed under)
     month_key = str(current_month)
     state['months'][month_key]['income'] += amount
     
     # Recalculate totals
     state['totals'] = calculate_ytd_totals(state)
     
+    # Single save for the counter, income and totals updates
     config.save_state(state)
     
     # Send confirmation
@@ -1,21 +1,54 @@
-import sys
-from pathlib import Path
-sys.path.append(str(Path(__file__).parent.parent))
-
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 import config
 from config import DATA_FOLDER_PATH
 from utils import formatters, validators
-from core import calculator
-from services import ledger_service, pdf_service
+from core import calculator, tax_calculator
+from handlers.callbacks import approve_callback_data, stash_pending_document
+# services (weasyprint, openpyxl) are imported inside the handlers that use them to keep startup fast
+import asyncio
+import io
 import os
+from pathlib import Path
+import re
+from functools import lru_cache
 
 
+# Straight and curly quote marks, stripped from free-text arguments
+_QUOTE_TRANS = str.maketrans("", "", '"\'\u201c\u201d\u2018\u2019')
 
-async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Send help message."""
-    help_text = """
+# Payment method keywords recognised at the end of /receipt (matched as substrings of the last word)
+_PAYMENT_KEYWORDS = ('cash', 'העברה', 'בנקאית', 'check', 'צ\'ק', 'credit', 'אשראי', 'bit', 'ביט', 'paypal')
+_PAYMENT_RE = re.compile("|".join(map(re.escape, _PAYMENT_KEYWORDS)))
+
+# Index 0 is a placeholder so months index directly (1 = January)
+_MONTH_NAMES = ("", "January", "February", "March", "April", "May", "June",
+                "July", "August", "September", "October", "November", "December")
+
+# /settings keys: key -> (section of state['settings'], value parser)
+_SETTING_HANDLERS = {
+    'name': ('business', str),
+    'dealer_id': ('business', str),
+    'address': ('business', str),
+    'contact': ('business', str),
+    'pension_rate': ('rates', float),
+    'study_rate_deductible': ('rates', float),
+    'study_cap_total': ('rates', float),
+    'vat_rate': ('rates', float),
+}
+_SETTING_ARG_RE = re.compile(r"([^=]+)=(.*)")
+
+# Most entries /last will show
+_LAST_ENTRIES_MAX = 50
+
+# Last rendered reply of the commands that only format the analysis: name -> (analysis, message, ...).
+# calculate_full_analysis returns the same memoized object until the state changes, so an
+# identity match means the message would come out the same; any other input a reply shows
+# (e.g. the year in /projection) is stored after the message and checked too.
+_REPLY_CACHE = {}
+
+# Static replies, built once at import
+_HELP_TEXT = """
 <b>📚 Commands Cheat Sheet</b>
 
 <b>💰 Core Workflow:</b>
@@ -61,47 +94,101 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 • /summary shows what's left to deposit
 • Use /cancel anytime to exit a conversation
 """
-    
-    await update.message.reply_text(help_text, parse_mode='HTML')
+
+_UPDATE_USAGE = (
+    "❌ Invalid format. Use: /update income=1000 expenses=200\n"
+    "💡 Tip: You can update just one field at a time!"
+)
+
+_DEPOSIT_USAGE = "❌ Invalid format. Use: /deposit pension=2000 study=500"
+
+_PAYNI_USAGE = (
+    "❌ Usage: /payni <amount>\n"
+    "Example: /payni 1500\n\n"
+    "Records how much NI you paid this month."
+)
+
+_PAYTAX_USAGE = (
+    "❌ Usage: /paytax <amount>\n"
+    "Example: /paytax 3000\n\n"
+    "Records how much income tax you paid this month."
+)
+
+_RECEIPT_USAGE = (
+    "❌ Usage: /receipt <amount> <client> \"description\" [payment_method]\n\n"
+    "Examples:\n"
+    "• /receipt 3500 TechStartup \"Website development - January\"\n"
+    "• /receipt 2500 ClientName \"Consulting services\" \"העברה בנקאית\"\n"
+    "• /receipt 1800 ABC \"Monthly retainer\" Cash"
+)
+
+_INVOICE_USAGE = (
+    "❌ Usage: /invoice <amount> <client> [description]\n"
+    "Example: /invoice 2016 Algolight \"September services\""
+)
+
+_EXPENSE_USAGE = (
+    "❌ Usage: /expense AMOUNT VENDOR [description] [vat]\n\n"
+    "Examples:\n"
+    "• /expense 150 OfficeMax \"Office supplies\"\n"
+    "• /expense 177 Restaurant \"Team lunch\" vat\n\n"
+    "Add 'vat' at the end if amount INCLUDES VAT (will extract VAT automatically)"
+)
+
+_SETTINGS_USAGE = (
+    "<b>Usage:</b>\n"
+    "/settings name=Your Business Name\n"
+    "/settings dealer_id=123456789\n"
+    "/settings address=Your Address\n"
+    "/settings contact=email@example.com | +972-50-XXXXXXX\n"
+)
+
+_SETMONTH_USAGE = "❌ Usage: /setmonth MONTH YEAR\nExample: /setmonth 1 2025"
+
+# Shown by /setmonth after the simulation mode line
+_SETMONTH_HELP = (
+    "<b>Commands:</b>\n"
+    "/setmonth MONTH YEAR — Set specific month\n"
+    "/nextmonth — Advance one month\n"
+    "/nextmonth N — Advance N months\n"
+    "/setmonth off — Disable simulation\n\n"
+    "<b>Examples:</b>\n"
+    "/setmonth 1 2025 — Start at January 2025\n"
+    "/nextmonth — Move to next month\n"
+)
+
+
+async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Send help message."""
+    await update.message.reply_text(_HELP_TEXT, parse_mode='HTML')
 
 
 async def update_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Update monthly values (cumulative - adds to existing values)."""
     state = config.load_state()
-    current_month = config.get_current_month()
+    current_month = config.get_current_month(state)
     user_id = update.effective_user.id
     
     # Parse command arguments
-    args = update.message.text.replace("/update", "").strip()
-    updates = validators.parse_update_command(args)
+    updates = validators.parse_update_command(context.args)
     
     if not updates:
-        await update.message.reply_text(
-            "❌ Invalid format. Use: /update income=1000 expenses=200\n"
-            "💡 Tip: You can update just one field at a time!"
-        )
+        await update.message.reply_text(_UPDATE_USAGE)
         return
     
     # Update state (ADD to existing values, don't overwrite)
-    month_key = str(current_month)
-    previous_values = {}
-    new_values = {}
-    
+    month = state["months"][str(current_month)]
+    previous_values = {key: month[key] for key in updates}
     for key, value in updates.items():
-        previous_values[key] = state["months"][month_key][key]
-        state["months"][month_key][key] += value  # ADD instead of overwrite
-        new_values[key] = state["months"][month_key][key]
+        month[key] += value  # ADD instead of overwrite
     
     config.save_state(state)
     
     # Create detailed summary message
-    summary_lines = []
-    for key, added_value in updates.items():
-        prev = previous_values[key]
-        new = new_values[key]
-        summary_lines.append(f"  {key.capitalize()}: ₪{prev:,.0f} + ₪{added_value:,.0f} = ₪{new:,.0f}")
-    
-    summary = "\n".join(summary_lines)
+    summary = "\n".join([
+        f"  {key.capitalize()}: ₪{previous_values[key]:,.0f} + ₪{added_value:,.0f} = ₪{month[key]:,.0f}"
+        for key, added_value in updates.items()
+    ])
     
     await update.message.reply_text(
         f"✅ Updated {current_month}/{state['year']}:\n{summary}\n\n"
@@ -113,6 +200,10 @@ async def recommend_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Quick deposit recommendations based on current income."""
     state = config.load_state()
     analysis = calculator.calculate_full_analysis(state)
+    cached = _REPLY_CACHE.get("recommend")
+    if cached and cached[0] is analysis:
+        await update.message.reply_text(cached[1], parse_mode='HTML')
+        return
     
     totals = analysis['totals']
     remaining = analysis['remaining']
@@ -143,28 +234,26 @@ async def recommend_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     message += f"💡 <i>Use /deposit pension=X study=Y to record your deposits</i>\n"
     message += f"📊 <i>Use /summary for detailed analysis</i>"
     
+    _REPLY_CACHE["recommend"] = (analysis, message)
     await update.message.reply_text(message, parse_mode='HTML')
 
 
 async def deposit_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Record pension/study fund deposits."""
     state = config.load_state()
-    current_month = config.get_current_month()
+    current_month = config.get_current_month(state)
     
     # Parse command
-    args = update.message.text.replace("/deposit", "").strip()
-    deposits = validators.parse_deposit_command(args)
+    deposits = validators.parse_deposit_command(context.args)
     
     if not deposits:
-        await update.message.reply_text(
-            "❌ Invalid format. Use: /deposit pension=2000 study=500"
-        )
+        await update.message.reply_text(_DEPOSIT_USAGE)
         return
     
     # Add to current month
-    month_key = str(current_month)
+    month = state["months"][str(current_month)]
     for key, value in deposits.items():
-        state["months"][month_key][key] += value
+        month[key] += value
     
     config.save_state(state)
     
@@ -186,91 +275,78 @@ async def summary_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     suggestions = analysis['suggestions']
     tax_analysis = analysis['tax_analysis']
     
+    # Most amounts are printed in more than one section, so each is formatted once
+    fc = lru_cache(maxsize=None)(formatters.format_currency)
+    
     # Table 1: Current State - Clean bullet format
-    state_table = "<b>📈 Current State:</b>\n\n"
-    state_table += f"<b>Income & Expenses:</b>\n"
-    state_table += f"• Gross Income: {formatters.format_currency(totals['income_ytd'])}\n"
-    state_table += f"• Expenses: {formatters.format_currency(totals['expenses_ytd'])}\n"
-    state_table += f"• <b>Net Income: {formatters.format_currency(totals['net_income_ytd'])}</b>\n\n"
-    
-    state_table += f"<b>Pension Fund:</b>\n"
-    state_table += f"• Deposited: {formatters.format_currency(totals['pension_total'])}\n"
-    state_table += f"• Cap (16.5%): {formatters.format_currency(caps['pension_cap'])}\n"
-    state_table += f"• Remaining: {formatters.format_currency(remaining['pension_remaining'])}\n\n"
-    
-    state_table += f"<b>Study Fund:</b>\n"
-    state_table += f"• Deposited: {formatters.format_currency(totals['study_total'])}\n"
-    state_table += f"• Deductible Cap (4.5%): {formatters.format_currency(caps['study_deductible_cap'])}\n"
-    state_table += f"• Deductible Remaining: {formatters.format_currency(remaining['study_deductible_remaining'])}\n"
-    state_table += f"• Total Cap: ₪20,520\n"
-    state_table += f"• Total Remaining: {formatters.format_currency(remaining['study_total_remaining'])}\n\n"
+    state_table = [
+        "<b>📈 Current State:</b>\n\n",
+        "<b>Income & Expenses:</b>\n",
+        f"• Gross Income: {fc(totals['income_ytd'])}\n",
+        f"• Expenses: {fc(totals['expenses_ytd'])}\n",
+        f"• <b>Net Income: {fc(totals['net_income_ytd'])}</b>\n\n",
+        
+        "<b>Pension Fund:</b>\n",
+        f"• Deposited: {fc(totals['pension_total'])}\n",
+        f"• Cap (16.5%): {fc(caps['pension_cap'])}\n",
+        f"• Remaining: {fc(remaining['pension_remaining'])}\n\n",
+        
+        "<b>Study Fund:</b>\n",
+        f"• Deposited: {fc(totals['study_total'])}\n",
+        f"• Deductible Cap (4.5%): {fc(caps['study_deductible_cap'])}\n",
+        f"• Deductible Remaining: {fc(remaining['study_deductible_remaining'])}\n",
+        "• Total Cap: ₪20,520\n",
+        f"• Total Remaining: {fc(remaining['study_total_remaining'])}\n\n",
+    ]
     
     # Table 2: Tax Analysis - Monthly vs Yearly Comparison
     comparison = tax_analysis['comparison']
+    # Sub-sections read many times below
+    monthly = comparison['monthly']
+    yearly = comparison['yearly']
+    tax_summary = tax_analysis['summary']
+    marginal_rate = tax_analysis['tax']['marginal_rate']
     
-    tax_rows = [
-        ("", "Monthly", "Yearly"),
-        ("─" * 20, "─" * 12, "─" * 12),
-        ("Net Income", 
-         formatters.format_currency(comparison['monthly']['income']),
-         formatters.format_currency(comparison['yearly']['income'])),
-        ("", "", ""),
-        ("Income Tax", 
-         formatters.format_currency(comparison['monthly']['tax']),
-         formatters.format_currency(comparison['yearly']['tax'])),
-        ("Tax Rate", f"{tax_analysis['summary']['tax_percentage']:.1f}%", f"{tax_analysis['summary']['tax_percentage']:.1f}%"),
-        ("Marginal Rate", f"{tax_analysis['tax']['marginal_rate']*100:.1f}%", f"{tax_analysis['tax']['marginal_rate']*100:.1f}%"),
-        ("", "", ""),
-        ("National Insurance (Employee)", 
-         formatters.format_currency(comparison['monthly']['ni_employee']),
-         formatters.format_currency(comparison['yearly']['ni_employee'])),
-        ("Health Tax (Employee)", 
-         formatters.format_currency(tax_analysis['national_insurance']['health_amount'] / 12),
-         formatters.format_currency(tax_analysis['national_insurance']['health_amount'])),
-        ("NI + Health Rate", f"{tax_analysis['summary']['ni_percentage']:.1f}%", f"{tax_analysis['summary']['ni_percentage']:.1f}%"),
-        ("", "", ""),
-        ("Total Tax Burden", 
-         formatters.format_currency(comparison['monthly']['total_burden']),
-         formatters.format_currency(comparison['yearly']['total_burden'])),
-        ("Effective Rate", f"{comparison['monthly']['effective_rate']*100:.1f}%", f"{comparison['yearly']['effective_rate']*100:.1f}%"),
-        ("Take-Home Pay", 
-         formatters.format_currency(comparison['monthly']['take_home']),
-         formatters.format_currency(comparison['yearly']['take_home'])),
-    ]
+    # Percentages printed in more than one place, formatted once
+    tax_pct = f"{tax_summary['tax_percentage']:.1f}%"
+    ni_pct = f"{tax_summary['ni_percentage']:.1f}%"
+    marginal_pct = f"{marginal_rate*100:.1f}%"
     
     # Format as simple list (fixed-width fails in Telegram)
-    tax_table = "<b>💰 Tax Analysis (Self-Employed):</b>\n\n"
-    tax_table += f"<b>This Month</b> <i>(based on {totals['months_with_data']} month(s) of data)</i>:\n"
-    tax_table += f"• Taxable Income: {formatters.format_currency(comparison['monthly']['income'])}\n"
-    tax_table += f"  <i>(After pension & study deductions)</i>\n"
-    tax_table += f"• Income Tax: {formatters.format_currency(comparison['monthly']['tax'])}\n"
-    tax_table += f"• NI + Health: {formatters.format_currency(comparison['monthly']['ni_employee'])}\n"
-    tax_table += f"• <b>Total Due: {formatters.format_currency(comparison['monthly']['total_burden'])}</b>\n"
-    tax_table += f"• Take-Home: {formatters.format_currency(comparison['monthly']['take_home'])}\n"
-    tax_table += f"• Effective Rate: {comparison['monthly']['effective_rate']*100:.1f}%\n\n"
-    
-    tax_table += f"<b>Projected Annual</b> <i>(if you continue at this rate)</i>:\n"
-    tax_table += f"• Taxable Income: {formatters.format_currency(comparison['yearly']['income'])}\n"
-    tax_table += f"  <i>(After pension & study deductions)</i>\n"
-    tax_table += f"• Income Tax: {formatters.format_currency(comparison['yearly']['tax'])} ({tax_analysis['summary']['tax_percentage']:.1f}%)\n"
-    tax_table += f"• NI + Health: {formatters.format_currency(comparison['yearly']['ni_employee'])} ({tax_analysis['summary']['ni_percentage']:.1f}%)\n"
-    tax_table += f"• <b>Total: {formatters.format_currency(comparison['yearly']['total_burden'])}</b>\n"
-    tax_table += f"• Take-Home: {formatters.format_currency(comparison['yearly']['take_home'])}\n"
-    tax_table += f"• Effective Rate: {comparison['yearly']['effective_rate']*100:.1f}%\n"
-    tax_table += f"• Marginal Rate: {tax_analysis['tax']['marginal_rate']*100:.1f}%\n\n"
+    tax_table = [
+        "<b>💰 Tax Analysis (Self-Employed):</b>\n\n",
+        f"<b>This Month</b> <i>(based on {totals['months_with_data']} month(s) of data)</i>:\n",
+        f"• Taxable Income: {fc(monthly['income'])}\n",
+        "  <i>(After pension & study deductions)</i>\n",
+        f"• Income Tax: {fc(monthly['tax'])}\n",
+        f"• NI + Health: {fc(monthly['ni_employee'])}\n",
+        f"• <b>Total Due: {fc(monthly['total_burden'])}</b>\n",
+        f"• Take-Home: {fc(monthly['take_home'])}\n",
+        f"• Effective Rate: {monthly['effective_rate']*100:.1f}%\n\n",
+        
+        "<b>Projected Annual</b> <i>(if you continue at this rate)</i>:\n",
+        f"• Taxable Income: {fc(yearly['income'])}\n",
+        "  <i>(After pension & study deductions)</i>\n",
+        f"• Income Tax: {fc(yearly['tax'])} ({tax_pct})\n",
+        f"• NI + Health: {fc(yearly['ni_employee'])} ({ni_pct})\n",
+        f"• <b>Total: {fc(yearly['total_burden'])}</b>\n",
+        f"• Take-Home: {fc(yearly['take_home'])}\n",
+        f"• Effective Rate: {yearly['effective_rate']*100:.1f}%\n",
+        f"• Marginal Rate: {marginal_pct}\n\n",
+    ]
     
     # Add "What's Left" section
     whats_left = f"""
 <b>🎯 What's Left to Do This Year:</b>
 
 <b>Deposit Room Remaining:</b>
-• Pension: {formatters.format_currency(remaining['pension_remaining'])} (out of {formatters.format_currency(caps['pension_cap'])})
-• Study (Deductible): {formatters.format_currency(remaining['study_deductible_remaining'])} (out of {formatters.format_currency(caps['study_deductible_cap'])})
-• Study (Tax-Free): {formatters.format_currency(remaining['study_total_remaining'])} (out of ₪20,520)
+• Pension: {fc(remaining['pension_remaining'])} (out of {fc(caps['pension_cap'])})
+• Study (Deductible): {fc(remaining['study_deductible_remaining'])} (out of {fc(caps['study_deductible_cap'])})
+• Study (Tax-Free): {fc(remaining['study_total_remaining'])} (out of ₪20,520)
 
 <b>If You Max Out Caps:</b>
-• Total Additional Deposits: {formatters.format_currency(remaining['pension_remaining'] + remaining['study_total_remaining'])}
-• Tax Saved: ~{formatters.format_currency((remaining['pension_remaining'] + remaining['study_deductible_remaining']) * tax_analysis['tax']['marginal_rate'])}
+• Total Additional Deposits: {fc(remaining['pension_remaining'] + remaining['study_total_remaining'])}
+• Tax Saved: ~{fc((remaining['pension_remaining'] + remaining['study_deductible_remaining']) * marginal_rate)}
 • Months Left: {totals['months_left']} months
 
 <b>Quick Actions:</b>
@@ -282,18 +358,20 @@ async def summary_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Add concise summary
     summary_text = f"""
 <b>📋 Quick Summary:</b>
-• Monthly Take-Home: {formatters.format_currency(comparison['monthly']['take_home'])}
-• Tax Burden: {tax_analysis['summary']['tax_percentage']:.1f}% income + {tax_analysis['summary']['ni_percentage']:.1f}% NI+Health = {tax_analysis['summary']['total_effective_rate']*100:.1f}% total
-• Marginal Rate: {tax_analysis['tax']['marginal_rate']*100:.1f}% (next ₪1 taxed at this rate)
-• Health Tax: {tax_analysis['summary']['health_percentage']:.1f}% of income
+• Monthly Take-Home: {fc(monthly['take_home'])}
+• Tax Burden: {tax_pct} income + {ni_pct} NI+Health = {tax_summary['total_effective_rate']*100:.1f}% total
+• Marginal Rate: {marginal_pct} (next ₪1 taxed at this rate)
+• Health Tax: {tax_summary['health_percentage']:.1f}% of income
 """
     
     # Combine and send
-    message = f"<b>📊 Financial Summary - {state['year']}</b>\n\n"
-    message += state_table + "\n\n"
-    message += tax_table + "\n\n"
-    message += whats_left + "\n"
-    message += summary_text
+    message = "".join([
+        f"<b>📊 Financial Summary - {state['year']}</b>\n\n",
+        *state_table, "\n\n",
+        *tax_table, "\n\n",
+        whats_left, "\n",
+        summary_text,
+    ])
     
     await update.message.reply_text(message, parse_mode='HTML')
 
@@ -304,21 +382,17 @@ async def payni_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Record NI payment for current month."""
     args = context.args
     if len(args) != 1:
-        await update.message.reply_text(
-            "❌ Usage: /payni <amount>\n"
-            "Example: /payni 1500\n\n"
-            "Records how much NI you paid this month."
-        )
+        await update.message.reply_text(_PAYNI_USAGE)
         return
     
     try:
         amount = validators.parse_amount(args[0])
-    except:
+    except ValueError:
         await update.message.reply_text("❌ Invalid amount format")
         return
     
     state = config.load_state()
-    current_month = str(config.get_current_month())
+    current_month = str(config.get_current_month(state))
     
     state['months'][current_month]['ni_paid'] = amount
     config.save_state(state)
@@ -334,21 +408,17 @@ async def paytax_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Record income tax payment for current month."""
     args = context.args
     if len(args) != 1:
-        await update.message.reply_text(
-            "❌ Usage: /paytax <amount>\n"
-            "Example: /paytax 3000\n\n"
-            "Records how much income tax you paid this month."
-        )
+        await update.message.reply_text(_PAYTAX_USAGE)
         return
     
     try:
         amount = validators.parse_amount(args[0])
-    except:
+    except ValueError:
         await update.message.reply_text("❌ Invalid amount format")
         return
     
     state = config.load_state()
-    current_month = str(config.get_current_month())
+    current_month = str(config.get_current_month(state))
     
     state['months'][current_month]['tax_paid'] = amount
     config.save_state(state)
@@ -363,8 +433,7 @@ async def paytax_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def monthly_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show current month's tax and NI projections."""
     state = config.load_state()
-    current_month = config.get_current_month()
-    current_year = config.get_current_year()
+    current_year, current_month = config.get_current_year_month(state)
     
     # Get current month's data
     month_key = str(current_month)
@@ -381,55 +450,61 @@ async def monthly_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tax_settings = state['settings']['rates']['tax']
     ni_settings = state['settings']['rates']['ni']
     
-    # Calculate monthly NI (self-employed only - no employer contributions)
-    from core import tax_calculator
-    # NI is calculated on MONTHLY net income (not divided by 12!)
-    ni_calc = tax_calculator.calculate_national_insurance(monthly_net, ni_settings)
-    monthly_ni_total = ni_calc['total_amount']
-    
-    # Calculate taxable income for this month (after deductions)
-    # Deductible amounts: pension + study (up to deductible cap)
-    deductible_study = min(monthly_study, monthly_net * 0.045)  # 4.5% cap
-    deductible_pension = min(monthly_pension, monthly_net * 0.165)  # 16.5% cap
-    
-    # Monthly taxable income
-    monthly_taxable = monthly_net - deductible_pension - deductible_study
-    
-    # Project to annual to calculate in correct tax bracket
-    # Then divide by 12 to get monthly portion
-    if monthly_taxable > 0:
-        # Assume this monthly rate continues for full year
-        annual_taxable_projection = monthly_taxable * 12
-        tax_calc = tax_calculator.calculate_income_tax(annual_taxable_projection, tax_settings)
-        monthly_tax = tax_calc['net_tax'] / 12
+    # Nothing is due on a month without net income (and its deduction caps are zero)
+    if monthly_net <= 0:
+        monthly_ni_total = 0.0
+        monthly_tax = 0.0
+        deductible_study = deductible_pension = 0.0
+        monthly_taxable = 0.0
     else:
-        monthly_tax = 0
+        # Calculate monthly NI (self-employed only - no employer contributions)
+        # NI is calculated on MONTHLY net income (not divided by 12!)
+        ni_calc = tax_calculator.calculate_national_insurance(monthly_net, ni_settings, with_breakdown=False)
+        monthly_ni_total = ni_calc['total_amount']
+        
+        # Calculate taxable income for this month (after deductions)
+        # Deductible amounts: pension + study (up to deductible cap)
+        deductible_study = min(monthly_study, monthly_net * 0.045)  # 4.5% cap
+        deductible_pension = min(monthly_pension, monthly_net * 0.165)  # 16.5% cap
+        
+        # Monthly taxable income
+        monthly_taxable = monthly_net - deductible_pension - deductible_study
+        
+        # Project to annual to calculate in correct tax bracket
+        # Then divide by 12 to get monthly portion
+        if monthly_taxable > 0:
+            # Assume this monthly rate continues for full year
+            annual_taxable_projection = monthly_taxable * 12
+            tax_calc = tax_calculator.calculate_income_tax(annual_taxable_projection, tax_settings, with_breakdown=False)
+            monthly_tax = tax_calc['net_tax'] / 12
+        else:
+            monthly_tax = 0.0
     
     # Build message
-    message = f"📅 <b>Monthly Projection - {current_month}/{current_year}</b>\n\n"
+    parts = [f"📅 <b>Monthly Projection - {current_month}/{current_year}</b>\n\n"]
     
-    message += f"<b>💰 This Month's Income:</b>\n"
-    message += f"• Gross Income: {formatters.format_currency(monthly_income)}\n"
-    message += f"• Expenses: {formatters.format_currency(monthly_expenses)}\n"
-    message += f"• <b>Net Income: {formatters.format_currency(monthly_net)}</b>\n\n"
+    parts.append(f"<b>💰 This Month's Income:</b>\n")
+    parts.append(f"• Gross Income: {formatters.format_currency(monthly_income)}\n")
+    parts.append(f"• Expenses: {formatters.format_currency(monthly_expenses)}\n")
+    parts.append(f"• <b>Net Income: {formatters.format_currency(monthly_net)}</b>\n\n")
     
-    message += f"<b>🏦 This Month's Deposits:</b>\n"
-    message += f"• Pension (Deductible): {formatters.format_currency(deductible_pension)}\n"
+    parts.append(f"<b>🏦 This Month's Deposits:</b>\n")
+    parts.append(f"• Pension (Deductible): {formatters.format_currency(deductible_pension)}\n")
     if monthly_pension > deductible_pension:
-        message += f"  <i>(Total deposited: {formatters.format_currency(monthly_pension)}, {formatters.format_currency(monthly_pension - deductible_pension)} non-deductible)</i>\n"
-    message += f"• Study (Deductible): {formatters.format_currency(deductible_study)}\n"
+        parts.append(f"  <i>(Total deposited: {formatters.format_currency(monthly_pension)}, {formatters.format_currency(monthly_pension - deductible_pension)} non-deductible)</i>\n")
+    parts.append(f"• Study (Deductible): {formatters.format_currency(deductible_study)}\n")
     if monthly_study > deductible_study:
-        message += f"  <i>(Total deposited: {formatters.format_currency(monthly_study)}, {formatters.format_currency(monthly_study - deductible_study)} non-deductible)</i>\n"
-    message += f"• <b>Total Deductions: {formatters.format_currency(deductible_pension + deductible_study)}</b>\n\n"
+        parts.append(f"  <i>(Total deposited: {formatters.format_currency(monthly_study)}, {formatters.format_currency(monthly_study - deductible_study)} non-deductible)</i>\n")
+    parts.append(f"• <b>Total Deductions: {formatters.format_currency(deductible_pension + deductible_study)}</b>\n\n")
     
-    message += f"<b>💵 Taxable Income:</b>\n"
-    message += f"• Net - Deductions: {formatters.format_currency(monthly_taxable)}\n"
-    message += f"  <i>(₪{monthly_net:,.0f} - ₪{deductible_pension + deductible_study:,.0f})</i>\n\n"
+    parts.append(f"<b>💵 Taxable Income:</b>\n")
+    parts.append(f"• Net - Deductions: {formatters.format_currency(monthly_taxable)}\n")
+    parts.append(f"  <i>(₪{monthly_net:,.0f} - ₪{deductible_pension + deductible_study:,.0f})</i>\n\n")
     
-    message += f"<b>📊 Tax & NI Due This Month:</b>\n"
-    message += f"• Income Tax: {formatters.format_currency(monthly_tax)}\n"
-    message += f"• NI + Health: {formatters.format_currency(monthly_ni_total)}\n"
-    message += f"• <b>Total Due: {formatters.format_currency(monthly_tax + monthly_ni_total)}</b>\n\n"
+    parts.append(f"<b>📊 Tax & NI Due This Month:</b>\n")
+    parts.append(f"• Income Tax: {formatters.format_currency(monthly_tax)}\n")
+    parts.append(f"• NI + Health: {formatters.format_currency(monthly_ni_total)}\n")
+    parts.append(f"• <b>Total Due: {formatters.format_currency(monthly_tax + monthly_ni_total)}</b>\n\n")
     
     # Show payments and remaining
     tax_paid = month_data.get('tax_paid', 0)
@@ -438,33 +513,35 @@ async def monthly_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     ni_remaining = max(0, monthly_ni_total - ni_paid)
     
     if tax_paid > 0 or ni_paid > 0:
-        message += f"<b>💳 Payments Made:</b>\n"
+        parts.append(f"<b>💳 Payments Made:</b>\n")
         if tax_paid > 0:
-            message += f"• Income Tax Paid: {formatters.format_currency(tax_paid)}\n"
-            message += f"  Remaining: {formatters.format_currency(tax_remaining)}\n"
+            parts.append(f"• Income Tax Paid: {formatters.format_currency(tax_paid)}\n")
+            parts.append(f"  Remaining: {formatters.format_currency(tax_remaining)}\n")
         if ni_paid > 0:
-            message += f"• NI Paid: {formatters.format_currency(ni_paid)}\n"
-            message += f"  Remaining: {formatters.format_currency(ni_remaining)}\n"
-        message += f"• <b>Total Remaining: {formatters.format_currency(tax_remaining + ni_remaining)}</b>\n\n"
+            parts.append(f"• NI Paid: {formatters.format_currency(ni_paid)}\n")
+            parts.append(f"  Remaining: {formatters.format_currency(ni_remaining)}\n")
+        parts.append(f"• <b>Total Remaining: {formatters.format_currency(tax_remaining + ni_remaining)}</b>\n\n")
     else:
-        message += f"<i>💡 Use /paytax and /payni to track payments</i>\n\n"
+        parts.append(f"<i>💡 Use /paytax and /payni to track payments</i>\n\n")
     
     # Calculate take-home
     take_home = monthly_net - monthly_tax - monthly_ni_total
-    message += f"<b>💰 Net After Tax & NI:</b>\n"
-    message += f"• Take-Home: {formatters.format_currency(take_home)}\n"
-    message += f"  <i>(Before deposits of ₪{monthly_pension + monthly_study:,.0f})</i>\n\n"
+    parts.append(f"<b>💰 Net After Tax & NI:</b>\n")
+    parts.append(f"• Take-Home: {formatters.format_currency(take_home)}\n")
+    parts.append(f"  <i>(Before deposits of ₪{monthly_pension + monthly_study:,.0f})</i>\n\n")
     
     # Get recommendations for this month
     analysis = calculator.calculate_full_analysis(state)
     suggestions = analysis['suggestions']['balanced']
     
-    message += f"<b>💡 Recommended Deposits (Rest of Year):</b>\n"
-    message += f"  Pension: {formatters.format_currency(suggestions['pension'])} /month\n"
-    message += f"  Study: {formatters.format_currency(suggestions['study_total'])} /month\n\n"
+    parts.append(f"<b>💡 Recommended Deposits (Rest of Year):</b>\n")
+    parts.append(f"  Pension: {formatters.format_currency(suggestions['pension'])} /month\n")
+    parts.append(f"  Study: {formatters.format_currency(suggestions['study_total'])} /month\n\n")
+    
+    parts.append(f"💼 Use /summary for full YTD analysis\n")
+    parts.append(f"📈 Use /projection for year-end forecast")
     
-    message += f"💼 Use /summary for full YTD analysis\n"
-    message += f"📈 Use /projection for year-end forecast"
+    message = "".join(parts)
     
     await update.message.reply_text(message, parse_mode='HTML')
 
@@ -472,11 +549,16 @@ async def monthly_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def projection_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show comprehensive year-end projection."""
     state = config.load_state()
-    current_month = config.get_current_month()
-    current_year = config.get_current_year()
+    current_year, current_month = config.get_current_year_month(state)
     
     # Get current analysis
     analysis = calculator.calculate_full_analysis(state)
+    cached = _REPLY_CACHE.get("projection")
+    # The reply also shows the year, which isn't part of the analysis memo key
+    if cached and cached[0] is analysis and cached[2] == current_year:
+        await update.message.reply_text(cached[1], parse_mode='HTML')
+        return
+    
     totals = analysis['totals']
     caps = analysis['caps']
     remaining = analysis['remaining']
@@ -508,53 +590,55 @@ async def projection_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     # Calculate projected tax
     projected_taxable = projected_net - projected_pension_capped - min(projected_study_capped, projected_net * 0.045)
     tax_settings = state['settings']['rates']['tax']
-    from core import tax_calculator
-    projected_tax_calc = tax_calculator.calculate_income_tax(projected_taxable, tax_settings)
+    projected_tax_calc = tax_calculator.calculate_income_tax(projected_taxable, tax_settings, with_breakdown=False)
     
     # Build message
-    message = f"📈 <b>Year-End Projection - {current_year}</b>\n\n"
+    parts = [f"📈 <b>Year-End Projection - {current_year}</b>\n\n"]
     
-    message += f"<b>💰 Projected Year-End:</b>\n"
-    message += f"  Income: {formatters.format_currency(projected_income)}\n"
-    message += f"  Expenses: {formatters.format_currency(projected_expenses)}\n"
-    message += f"  <b>Net Income:</b> {formatters.format_currency(projected_net)}\n\n"
+    parts.append(f"<b>💰 Projected Year-End:</b>\n")
+    parts.append(f"  Income: {formatters.format_currency(projected_income)}\n")
+    parts.append(f"  Expenses: {formatters.format_currency(projected_expenses)}\n")
+    parts.append(f"  <b>Net Income:</b> {formatters.format_currency(projected_net)}\n\n")
     
-    message += f"<b>🏦 Projected Deposits:</b>\n"
-    message += f"  Pension: {formatters.format_currency(projected_pension_capped)}\n"
-    message += f"  Study: {formatters.format_currency(projected_study_capped)}\n"
-    message += f"  Total: {formatters.format_currency(projected_pension_capped + projected_study_capped)}\n\n"
+    parts.append(f"<b>🏦 Projected Deposits:</b>\n")
+    parts.append(f"  Pension: {formatters.format_currency(projected_pension_capped)}\n")
+    parts.append(f"  Study: {formatters.format_currency(projected_study_capped)}\n")
+    parts.append(f"  Total: {formatters.format_currency(projected_pension_capped + projected_study_capped)}\n\n")
     
-    message += f"<b>📊 Projected Tax:</b>\n"
-    message += f"  Taxable Income: {formatters.format_currency(projected_taxable)}\n"
-    message += f"  Income Tax: {formatters.format_currency(projected_tax_calc['net_tax'])}\n"
-    message += f"  Effective Rate: {projected_tax_calc['effective_rate']*100:.1f}%\n\n"
+    parts.append(f"<b>📊 Projected Tax:</b>\n")
+    parts.append(f"  Taxable Income: {formatters.format_currency(projected_taxable)}\n")
+    parts.append(f"  Income Tax: {formatters.format_currency(projected_tax_calc['net_tax'])}\n")
+    parts.append(f"  Effective Rate: {projected_tax_calc['effective_rate']*100:.1f}%\n\n")
     
-    message += f"<b>📅 Current Progress:</b>\n"
-    message += f"  Months completed: {current_month}/12\n"
-    message += f"  Months remaining: {months_left}\n"
-    message += f"  % of year: {(current_month/12)*100:.0f}%\n\n"
+    parts.append(f"<b>📅 Current Progress:</b>\n")
+    parts.append(f"  Months completed: {current_month}/12\n")
+    parts.append(f"  Months remaining: {months_left}\n")
+    parts.append(f"  % of year: {(current_month/12)*100:.0f}%\n\n")
     
-    message += f"<b>🎯 To Reach Projections:</b>\n"
+    parts.append(f"<b>🎯 To Reach Projections:</b>\n")
     if months_left > 0:
         needed_monthly_income = (projected_income - totals['income_ytd']) / months_left
         needed_monthly_pension = max(0, (projected_pension_capped - totals['pension_total']) / months_left)
         needed_monthly_study = max(0, (projected_study_capped - totals['study_total']) / months_left)
         
-        message += f"  Income: {formatters.format_currency(needed_monthly_income)}/month\n"
-        message += f"  Pension: {formatters.format_currency(needed_monthly_pension)}/month\n"
-        message += f"  Study: {formatters.format_currency(needed_monthly_study)}/month\n"
+        parts.append(f"  Income: {formatters.format_currency(needed_monthly_income)}/month\n")
+        parts.append(f"  Pension: {formatters.format_currency(needed_monthly_pension)}/month\n")
+        parts.append(f"  Study: {formatters.format_currency(needed_monthly_study)}/month\n")
     else:
-        message += f"  No months remaining!\n"
+        parts.append(f"  No months remaining!\n")
+    
+    parts.append(f"\n💡 Use /optimizer for December top-up strategy")
     
-    message += f"\n💡 Use /optimizer for December top-up strategy"
+    message = "".join(parts)
     
+    _REPLY_CACHE["projection"] = (analysis, message, current_year)
     await update.message.reply_text(message, parse_mode='HTML')
 
 
 async def optimizer_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """December top-up optimizer."""
     state = config.load_state()
-    current_month = config.get_current_month()
+    current_month = config.get_current_month(state)
     analysis = calculator.calculate_full_analysis(state)
     
     if current_month != 12:
@@ -564,6 +648,11 @@ async def optimizer_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
     
+    cached = _REPLY_CACHE.get("optimizer")
+    if cached and cached[0] is analysis:
+        await update.message.reply_text(cached[1], parse_mode='HTML')
+        return
+    
     remaining = analysis['remaining']
     
     message = "🎯 <b>December Top-Up Optimizer</b>\n\n"
@@ -572,6 +661,7 @@ async def optimizer_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     message += f"Study Fund: {formatters.format_currency(remaining['study_total_remaining'])}\n\n"
     message += "💡 Use /deposit to record these amounts."
     
+    _REPLY_CACHE["optimizer"] = (analysis, message)
     await update.message.reply_text(message, parse_mode='HTML')
 
 
@@ -580,13 +670,7 @@ async def receipt_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Parse command: /receipt <amount> <client> "description" [payment_method]
     args = context.args
     if len(args) < 2:
-        await update.message.reply_text(
-            "❌ Usage: /receipt <amount> <client> \"description\" [payment_method]\n\n"
-            "Examples:\n"
-            "• /receipt 3500 TechStartup \"Website development - January\"\n"
-            "• /receipt 2500 ClientName \"Consulting services\" \"העברה בנקאית\"\n"
-            "• /receipt 1800 ABC \"Monthly retainer\" Cash"
-        )
+        await update.message.reply_text(_RECEIPT_USAGE)
         return
     
     try:
@@ -597,20 +681,19 @@ async def receipt_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         remaining_text = " ".join(args[2:])
         
         # Strip all quote marks
-        remaining_text = remaining_text.replace('"', '').replace('"', '').replace('"', '').replace("'", '')
+        remaining_text = remaining_text.translate(_QUOTE_TRANS)
         
         # Split the remaining text to check for payment method
         parts = remaining_text.split()
         
         # Check if last arg is a known payment method keyword
-        payment_keywords = ['cash', 'העברה', 'בנקאית', 'check', 'צ\'ק', 'credit', 'אשראי', 'bit', 'ביט', 'paypal']
         payment_method = None
         description_parts = parts
         
         if parts:
             # Check if last word contains payment keyword
             last_word = parts[-1].lower()
-            if any(keyword in last_word for keyword in payment_keywords):
+            if _PAYMENT_RE.search(last_word):
                 payment_method = parts[-1]
                 description_parts = parts[:-1]
             # Check if last two words form a payment method (e.g., "העברה בנקאית")
@@ -622,7 +705,7 @@ async def receipt_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         description = " ".join(description_parts) if description_parts else "Services"
         
-    except:
+    except ValueError:
         await update.message.reply_text("❌ Invalid amount format")
         return
     
@@ -634,13 +717,17 @@ async def receipt_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
     
     # Use new organized folder structure
-    current_month = config.get_current_month()
-    current_year = config.get_current_year()
+    current_year, current_month = config.get_current_year_month(state)
     pdf_path = config.get_receipt_path(receipt_id, current_year, current_month)
     
+    from services import pdf_service
+    
     pdf = pdf_service.PDFService()
-    success = pdf.generate_receipt(
-        output_path=pdf_path,
+    # Rendered in memory; the file is only written once the receipt is approved
+    pdf_buffer = io.BytesIO()
+    success = await asyncio.to_thread(
+        pdf.generate_receipt,
+        output_path=pdf_buffer,
         receipt_id=receipt_id,
         client=client,
         amount=amount,
@@ -655,16 +742,18 @@ async def receipt_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Failed to generate receipt")
         return
     
-    # Send PDF for approval
-    with open(pdf_path, 'rb') as f:
-        await update.message.reply_document(
-            document=f,
-            caption=f"📄 Receipt {receipt_id}\n\nApprove & upload to Drive?",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("✅ Approve & Upload", callback_data=f"approve_{receipt_id}_{amount}_{client}"),
-                InlineKeyboardButton("❌ Cancel", callback_data="cancel")
-            ]])
-        )
+    # Send PDF for approval, keeping it until approve/cancel (see callbacks.handle_callback)
+    pdf_bytes = pdf_buffer.getvalue()
+    stash_pending_document(context, receipt_id, pdf_path, pdf_bytes, current_year, current_month)
+    await update.message.reply_document(
+        document=pdf_bytes,
+        filename=os.path.basename(pdf_path),
+        caption=f"📄 Receipt {receipt_id}\n\nApprove & upload to Drive?",
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("✅ Approve & Upload", callback_data=approve_callback_data(receipt_id, amount, client)),
+            InlineKeyboardButton("❌ Cancel", callback_data="cancel")
+        ]])
+    )
 
 
 async def invoice_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -672,22 +761,20 @@ async def invoice_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Parse command: /invoice <amount> <client> [description]
     args = context.args
     if len(args) < 2:
-        await update.message.reply_text(
-            "❌ Usage: /invoice <amount> <client> [description]\n"
-            "Example: /invoice 2016 Algolight \"September services\""
-        )
+        await update.message.reply_text(_INVOICE_USAGE)
         return
     
     try:
         amount = validators.parse_amount(args[0])
-        client = args[1]
-        # Strip quotes from description
-        description_text = " ".join(args[2:]) if len(args) > 2 else "Services"
-        description = description_text.replace('"', '').replace('"', '').replace('"', '').replace("'", '')
-    except:
+    except ValueError:
         await update.message.reply_text("❌ Invalid amount format")
         return
     
+    client = args[1]
+    # Strip quotes from description
+    description_text = " ".join(args[2:]) if len(args) > 2 else "Services"
+    description = description_text.translate(_QUOTE_TRANS)
+    
     # Generate invoice ID (R- prefix for invoices)
     state = config.load_state()
     invoice_info = state['settings']['invoice_numbering']
@@ -696,13 +783,17 @@ async def invoice_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
     
     # Use new organized folder structure
-    current_month = config.get_current_month()
-    current_year = config.get_current_year()
+    current_year, current_month = config.get_current_year_month(state)
     pdf_path = config.get_invoice_path(invoice_id, current_year, current_month)
     
+    from services import pdf_service
+    
     pdf = pdf_service.PDFService()
-    success = pdf.generate_invoice(
-        output_path=pdf_path,
+    # Rendered in memory; the file is only written once the invoice is approved
+    pdf_buffer = io.BytesIO()
+    success = await asyncio.to_thread(
+        pdf.generate_invoice,
+        output_path=pdf_buffer,
         invoice_id=invoice_id,
         client=client,
         amount=amount,
@@ -715,88 +806,98 @@ async def invoice_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Failed to generate invoice")
         return
     
-    # Send PDF for approval
-    with open(pdf_path, 'rb') as f:
-        await update.message.reply_document(
-            document=f,
-            caption=f"📄 Invoice {invoice_id}\n\nApprove & upload to Drive?",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("✅ Approve & Upload", callback_data=f"approve_{invoice_id}_{amount}_{client}"),
-                InlineKeyboardButton("❌ Cancel", callback_data="cancel")
-            ]])
-        )
+    # Send PDF for approval, keeping it until approve/cancel (see callbacks.handle_callback)
+    pdf_bytes = pdf_buffer.getvalue()
+    stash_pending_document(context, invoice_id, pdf_path, pdf_bytes, current_year, current_month)
+    await update.message.reply_document(
+        document=pdf_bytes,
+        filename=os.path.basename(pdf_path),
+        caption=f"📄 Invoice {invoice_id}\n\nApprove & upload to Drive?",
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("✅ Approve & Upload", callback_data=approve_callback_data(invoice_id, amount, client)),
+            InlineKeyboardButton("❌ Cancel", callback_data="cancel")
+        ]])
+    )
+
+
+async def _send_ledger(message, path: str, caption: str, missing_text: str):
+    """Send one ledger file, or a warning if it doesn't exist yet."""
+    # read_bytes() sizes its single read from the open file, so no separate exists() check is needed
+    try:
+        ledger_bytes = await asyncio.to_thread(Path(path).read_bytes)
+    except FileNotFoundError:
+        await message.reply_text(missing_text)
+        return
+    await message.reply_document(
+        document=ledger_bytes,
+        filename=os.path.basename(path),
+        caption=caption
+    )
 
 
 async def excel_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Send current month's and year's ledger Excel files."""
-    current_year = config.get_current_year()
-    current_month = config.get_current_month()
+    current_year, current_month = config.get_current_year_month()
     
     monthly_ledger = config.get_monthly_ledger_path(current_year, current_month)
     yearly_ledger = config.get_yearly_ledger_path(current_year)
     
-    # Send monthly ledger
-    if os.path.exists(monthly_ledger):
-        with open(monthly_ledger, 'rb') as f:
-            await update.message.reply_document(
-                document=f,
-                caption=f"📊 Monthly Ledger - {current_month:02d}/{current_year}"
-            )
-    else:
-        await update.message.reply_text(f"⚠️ Monthly ledger not found for {current_month:02d}/{current_year}")
-    
-    # Send yearly ledger
-    if os.path.exists(yearly_ledger):
-        with open(yearly_ledger, 'rb') as f:
-            await update.message.reply_document(
-                document=f,
-                caption=f"📊 Yearly Ledger - {current_year}"
-            )
-    else:
-        await update.message.reply_text(f"⚠️ Yearly ledger not found for {current_year}")
+    # The two uploads are independent, so send them concurrently
+    await asyncio.gather(
+        _send_ledger(
+            update.message, monthly_ledger,
+            f"📊 Monthly Ledger - {current_month:02d}/{current_year}",
+            f"⚠️ Monthly ledger not found for {current_month:02d}/{current_year}",
+        ),
+        _send_ledger(
+            update.message, yearly_ledger,
+            f"📊 Yearly Ledger - {current_year}",
+            f"⚠️ Yearly ledger not found for {current_year}",
+        ),
+    )
 
 
 async def last_entries_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show last n entries from yearly ledger."""
     n = 5
-    if context.args and context.args[0].isdigit():
-        n = int(context.args[0])
+    if context.args:
+        try:
+            # Capped so a huge N can't turn /last into a full ledger dump
+            n = max(1, min(_LAST_ENTRIES_MAX, int(context.args[0])))
+        except ValueError:
+            pass
     
     # Use yearly ledger to see all entries for the year
     current_year = config.get_current_year()
     yearly_ledger_path = config.get_yearly_ledger_path(current_year)
+    from services import ledger_service
     ledger = ledger_service.LedgerService(yearly_ledger_path)
-    entries = ledger.get_last_entries(n)
+    entries = await asyncio.to_thread(ledger.get_last_entries, n)
     
     if not entries:
         await update.message.reply_text("📝 No entries in ledger yet")
         return
     
-    message = f"<b>📋 Last {n} Entries:</b>\n\n"
-    for entry in reversed(entries):  # Show newest first
-        msg = f"{entry['ID']} | {entry['Type']} | {entry['Party/Vendor']}\n"
-        msg += f"{entry['Amount (₪)']}₪ | {entry['Date']}\n"
-        message += msg + "\n"
+    parts = [f"<b>📋 Last {n} Entries:</b>\n\n"]
+    parts.extend(
+        f"{entry['ID']} | {entry['Type']} | {entry['Party/Vendor']}\n"
+        f"{entry['Amount (₪)']}₪ | {entry['Date']}\n\n"
+        for entry in reversed(entries)  # Show newest first
+    )
     
-    await update.message.reply_text(message, parse_mode='HTML')
+    await update.message.reply_text("".join(parts), parse_mode='HTML')
 
 
 async def expense_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Start expense upload workflow with VAT support."""
     args = context.args
     if not args or len(args) < 1:
-        await update.message.reply_text(
-            "❌ Usage: /expense AMOUNT VENDOR [description] [vat]\n\n"
-            "Examples:\n"
-            "• /expense 150 OfficeMax \"Office supplies\"\n"
-            "• /expense 177 Restaurant \"Team lunch\" vat\n\n"
-            "Add 'vat' at the end if amount INCLUDES VAT (will extract VAT automatically)"
-        )
+        await update.message.reply_text(_EXPENSE_USAGE)
         return
     
     try:
         amount = validators.parse_amount(args[0])
-    except:
+    except ValueError:
         await update.message.reply_text("❌ Invalid amount format")
         return
     
@@ -811,7 +912,7 @@ async def expense_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # Strip quotes from description
     description_text = " ".join(desc_args) if desc_args else "Expense"
-    description = description_text.replace('"', '').replace('"', '').replace('"', '').replace("'", '')
+    description = description_text.translate(_QUOTE_TRANS)
     
     # Store pending expense data in user context
     context.user_data['pending_expense'] = {
@@ -828,8 +929,7 @@ async def expense_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         state = config.load_state()
         vat_rate = state['settings']['rates']['vat_rate']
         if vat_rate > 0:
-            amount_excl_vat = amount / (1 + vat_rate)
-            vat_amount = amount - amount_excl_vat
+            amount_excl_vat, vat_amount = calculator.split_vat(amount, vat_rate)
             message += f" (includes ₪{vat_amount:.2f} VAT)\n"
             message += f"Excl. VAT: ₪{amount_excl_vat:.2f}"
         else:
@@ -849,49 +949,49 @@ async def settings_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         state = config.load_state()
         business = state['settings']['business']
         
-        message = "⚙️ <b>Current Business Settings:</b>\n\n"
-        message += f"<b>Name:</b> {business['name']}\n"
-        message += f"<b>Dealer ID:</b> {business['dealer_id']}\n"
-        message += f"<b>Address:</b> {business['address']}\n"
-        message += f"<b>Contact:</b> {business['contact']}\n\n"
-        message += "<b>Usage:</b>\n"
-        message += "/settings name=Your Business Name\n"
-        message += "/settings dealer_id=123456789\n"
-        message += "/settings address=Your Address\n"
-        message += "/settings contact=email@example.com | +972-50-XXXXXXX\n"
+        message = (
+            "⚙️ <b>Current Business Settings:</b>\n\n"
+            f"<b>Name:</b> {business['name']}\n"
+            f"<b>Dealer ID:</b> {business['dealer_id']}\n"
+            f"<b>Address:</b> {business['address']}\n"
+            f"<b>Contact:</b> {business['contact']}\n\n"
+        )
         
-        await update.message.reply_text(message, parse_mode='HTML')
+        await update.message.reply_text(message + _SETTINGS_USAGE, parse_mode='HTML')
         return
     
-    # Parse settings update
-    state = config.load_state()
-    updated = []
+    # Parse settings update; validate every argument before touching the state
+    pairs = [(m.group(1).lower(), m.group(2)) for arg in args if (m := _SETTING_ARG_RE.match(arg))]
+    changes = []
+    errors = []
     
-    for arg in args:
-        if '=' in arg:
-            key, value = arg.split('=', 1)
-            key = key.lower()
-            
-            if key in ['name', 'dealer_id', 'address', 'contact']:
-                state['settings']['business'][key] = value
-                updated.append(f"{key}: {value}")
-            elif key in ['pension_rate', 'study_rate_deductible', 'study_cap_total']:
-                try:
-                    state['settings']['rates'][key] = float(value)
-                    updated.append(f"{key}: {value}")
-                except ValueError:
-                    await update.message.reply_text(f"❌ Invalid value for {key}: {value}")
-                    return
-            elif key == 'vat_rate':
-                try:
-                    state['settings']['rates']['vat_rate'] = float(value)
-                    updated.append(f"VAT rate: {float(value)*100:.1f}%")
-                except ValueError:
-                    await update.message.reply_text(f"❌ Invalid VAT rate: {value}")
-                    return
+    for key, value in pairs:
+        spec = _SETTING_HANDLERS.get(key)
+        if spec is None:
+            errors.append(f"❌ Unknown setting: {key}")
+            continue
+        
+        section, cast = spec
+        try:
+            changes.append((section, key, value, cast(value)))
+        except ValueError:
+            if key == 'vat_rate':
+                errors.append(f"❌ Invalid VAT rate: {value}")
             else:
-                await update.message.reply_text(f"❌ Unknown setting: {key}")
-                return
+                errors.append(f"❌ Invalid value for {key}: {value}")
+    
+    if errors:
+        await update.message.reply_text("\n".join(errors))
+        return
+    
+    state = config.load_state()
+    updated = []
+    for section, key, value, parsed in changes:
+        state['settings'][section][key] = parsed
+        if key == 'vat_rate':
+            updated.append(f"VAT rate: {parsed*100:.1f}%")
+        else:
+            updated.append(f"{key}: {value}")
     
     if updated:
         config.save_state(state)
@@ -918,21 +1018,11 @@ async def setmonth_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         sim_year = state.get("simulation", {}).get("current_year")
         
         if sim_month is None:
-            reply = "📅 <b>Simulation Mode: OFF</b>\n\n"
-            reply += f"Using real date: {config.get_current_month()}/{config.get_current_year()}\n\n"
+            mode = f"📅 <b>Simulation Mode: OFF</b>\n\nUsing real date: {config.get_current_month(state)}/{config.get_current_year(state)}\n\n"
         else:
-            reply = f"📅 <b>Simulation Mode: ON</b>\n\n"
-            reply += f"Simulated date: {sim_month}/{sim_year}\n\n"
-        
-        reply += "<b>Commands:</b>\n"
-        reply += "/setmonth MONTH YEAR — Set specific month\n"
-        reply += "/nextmonth — Advance one month\n"
-        reply += "/setmonth off — Disable simulation\n\n"
-        reply += "<b>Examples:</b>\n"
-        reply += "/setmonth 1 2025 — Start at January 2025\n"
-        reply += "/nextmonth — Move to next month\n"
+            mode = f"📅 <b>Simulation Mode: ON</b>\n\nSimulated date: {sim_month}/{sim_year}\n\n"
         
-        await message.reply_text(reply, parse_mode='HTML')
+        await message.reply_text(mode + _SETMONTH_HELP, parse_mode='HTML')
         return
     
     if args[0].lower() == "off":
@@ -944,7 +1034,7 @@ async def setmonth_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     if len(args) < 2:
-        await message.reply_text("❌ Usage: /setmonth MONTH YEAR\nExample: /setmonth 1 2025")
+        await message.reply_text(_SETMONTH_USAGE)
         return
     
     month = int(args[0])
@@ -966,12 +1056,9 @@ async def setmonth_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     state["year"] = year  # Update year in state too
     config.save_state(state)
     
-    month_names = ["", "January", "February", "March", "April", "May", "June",
-                    "July", "August", "September", "October", "November", "December"]
-    
     await message.reply_text(
         f"✅ Time travel activated!\n\n"
-        f"📅 Simulated date: {month_names[month]} {year}\n"
+        f"📅 Simulated date: {_MONTH_NAMES[month]} {year}\n"
         f"🔢 Current month: {month}/{year}\n\n"
         f"All commands will now use this date.\n"
         f"Use /nextmonth to advance one month."
@@ -979,7 +1066,10 @@ async def setmonth_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def nextmonth_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Advance to the next month in simulation."""
+    """Advance the simulation by one month, or by N with /nextmonth N."""
+    args = context.args
+    n = int(args[0]) if args and args[0].isdigit() and int(args[0]) > 0 else 1
+    
     state = config.load_state()
     
     if "simulation" not in state:
@@ -990,26 +1080,20 @@ async def nextmonth_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     if current_month is None:
         # Start simulation from current real month
-        current_month = config.get_current_month()
-        current_year = config.get_current_year()
+        current_year, current_month = config.get_current_year_month(state)
     
-    # Advance one month
-    current_month += 1
-    if current_month > 12:
-        current_month = 1
-        current_year += 1
+    # Advance n months in one go, so a long jump is still a single save
+    current_year, month_index = divmod(current_year * 12 + current_month - 1 + n, 12)
+    current_month = month_index + 1
     
     state["simulation"]["current_month"] = current_month
     state["simulation"]["current_year"] = current_year
     state["year"] = current_year
     config.save_state(state)
     
-    month_names = ["", "January", "February", "March", "April", "May", "June",
-                  "July", "August", "September", "October", "November", "December"]
-    
     await update.message.reply_text(
-        f"⏭️ Advanced to next month!\n\n"
-        f"📅 Current simulated date: {month_names[current_month]} {current_year}\n"
+        f"{'⏭️ Advanced to next month!' if n == 1 else f'⏭️ Advanced {n} months!'}\n\n"
+        f"📅 Current simulated date: {_MONTH_NAMES[current_month]} {current_year}\n"
         f"🔢 Month: {current_month}/{current_year}\n\n"
         f"Use /nextmonth to continue, or /summary to see updated calculations."
     )
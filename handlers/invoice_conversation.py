@@ -3,17 +3,15 @@ Conversational invoice generation handler.
 Uses multi-step conversation to avoid parsing issues with Hebrew/English.
 """
 
-import sys
-from pathlib import Path
-sys.path.append(str(Path(__file__).parent.parent))
-
+import asyncio
+import io
 import os
 from telegram import Update, ReplyKeyboardRemove, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 import config
 from config import DATA_FOLDER_PATH
 from utils import formatters, validators
-from services import pdf_service
+from handlers.callbacks import approve_callback_data, stash_pending_document
 
 # Conversation states
 AMOUNT, CLIENT, DESCRIPTION = range(3)
@@ -45,7 +43,7 @@ async def invoice_amount(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return CLIENT
         
-    except:
+    except ValueError:
         await update.message.reply_text(
             "❌ Invalid amount. Please enter a number (e.g., 3500 or 3,500.00)"
         )
@@ -107,16 +105,19 @@ async def generate_invoice_pdf(update: Update, context: ContextTypes.DEFAULT_TYP
     )
     
     # Get current month and year for organizing files
-    current_month = config.get_current_month()
-    current_year = config.get_current_year()
+    current_year, current_month = config.get_current_year_month(state)
     
     # Use new organized folder structure
     pdf_path = config.get_invoice_path(invoice_id, current_year, current_month)
     
     # Generate PDF
+    from services import pdf_service
     pdf = pdf_service.PDFService()
-    success = pdf.generate_invoice(
-        output_path=pdf_path,
+    # Rendered in memory; the file is only written once the invoice is approved
+    pdf_buffer = io.BytesIO()
+    success = await asyncio.to_thread(
+        pdf.generate_invoice,
+        output_path=pdf_buffer,
         invoice_id=invoice_id,
         client=invoice_data['client'],
         amount=invoice_data['amount'],
@@ -136,17 +137,19 @@ async def generate_invoice_pdf(update: Update, context: ContextTypes.DEFAULT_TYP
     summary += f"<b>Amount:</b> {formatters.format_currency(invoice_data['amount'])}\n"
     summary += f"<b>Description:</b> {invoice_data['description']}\n"
     
-    # Send PDF for approval
-    with open(pdf_path, 'rb') as f:
-        await update.message.reply_document(
-            document=f,
-            caption=summary,
-            parse_mode='HTML',
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("✅ Approve & Save", callback_data=f"approve_{invoice_id}_{invoice_data['amount']}_{invoice_data['client']}"),
-                InlineKeyboardButton("❌ Cancel", callback_data="cancel")
-            ]])
-        )
+    # Send PDF for approval, keeping it until approve/cancel (see callbacks.handle_callback)
+    pdf_bytes = pdf_buffer.getvalue()
+    stash_pending_document(context, invoice_id, pdf_path, pdf_bytes, current_year, current_month)
+    await update.message.reply_document(
+        document=pdf_bytes,
+        filename=os.path.basename(pdf_path),
+        caption=summary,
+        parse_mode='HTML',
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("✅ Approve & Save", callback_data=approve_callback_data(invoice_id, invoice_data['amount'], invoice_data['client'])),
+            InlineKeyboardButton("❌ Cancel", callback_data="cancel")
+        ]])
+    )
 
 
 async def cancel_invoice(update: Update, context: ContextTypes.DEFAULT_TYPE):
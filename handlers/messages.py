@@ -6,8 +6,9 @@ from telegram import Update
 from telegram.ext import ContextTypes
 import config
 from config import DATA_FOLDER_PATH
-from services import ledger_service
 from utils import formatters
+from core import calculator
+import asyncio
 import os
 from datetime import datetime
 
@@ -46,17 +47,30 @@ async def handle_expense_document(update: Update, context: ContextTypes.DEFAULT_
     expense_id = formatters.format_invoice_id(
         "E", expense_info['year'], expense_info['next_expense']
     )
+    # Reserve the number before the first await: with concurrent updates a second upload
+    # could otherwise read the same counter and overwrite this expense's file
+    reserved_number = expense_info['next_expense']
+    expense_info['next_expense'] += 1
     
     # Use new organized folder structure
-    current_year = config.get_current_year()
-    current_month = config.get_current_month()
+    current_year, current_month = config.get_current_year_month(state)
     
     # Get the proper expense folder path
     expense_folder = config.get_expenses_folder(current_year, current_month)
     
     # Save file
     file_path = os.path.join(expense_folder, f"{expense_id}.{file_ext}")
-    await file.download_to_drive(file_path)
+    try:
+        await file.download_to_drive(file_path)
+    except BaseException:
+        # Nothing was recorded under this number yet, so hand it back (unless a later upload
+        # already took the next one) rather than leave the shared cached state ahead of the file
+        if expense_info['next_expense'] == reserved_number + 1:
+            expense_info['next_expense'] = reserved_number
+        raise
+    
+    # The file now holds this number, so persist the reservation before the ledger write
+    config.save_state(state)
     
     # Extract data
     amount = expense_data['amount']
@@ -66,16 +80,17 @@ async def handle_expense_document(update: Update, context: ContextTypes.DEFAULT_
     vat_rate = state['settings']['rates']['vat_rate']
     
     # Calculate amount excluding VAT if needed
-    if include_vat and vat_rate > 0:
-        amount_excl_vat = amount / (1 + vat_rate)
-        vat_amount = amount - amount_excl_vat
+    if include_vat:
+        amount_excl_vat, vat_amount = calculator.split_vat(amount, vat_rate)
     else:
         amount_excl_vat = amount
         vat_amount = 0
     
     # Add to both monthly and yearly ledgers
+    from services import ledger_service
     ledger = ledger_service.LedgerService()
-    ledger.add_entry_to_all_ledgers(
+    await asyncio.to_thread(
+        ledger.add_entry_to_all_ledgers,
         entry_id=expense_id,
         entry_type="Expense",
         amount=amount,
@@ -94,9 +109,6 @@ async def handle_expense_document(update: Update, context: ContextTypes.DEFAULT_
     month_key = str(current_month)
     state["months"][month_key]["expenses"] += amount_excl_vat
     
-    # Increment expense counter
-    state['settings']['invoice_numbering']['next_expense'] += 1
-    
     config.save_state(state)
     
     # Clear pending expense
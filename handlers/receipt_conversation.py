@@ -3,17 +3,15 @@ Conversational receipt generation handler.
 Uses multi-step conversation to avoid parsing issues with Hebrew/English.
 """
 
-import sys
-from pathlib import Path
-sys.path.append(str(Path(__file__).parent.parent))
-
+import asyncio
+import io
 import os
 from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 import config
 from config import DATA_FOLDER_PATH
 from utils import formatters, validators
-from services import pdf_service
+from handlers.callbacks import approve_callback_data, stash_pending_document
 
 # Conversation states
 AMOUNT, CLIENT, DESCRIPTION, PAYMENT_METHOD = range(4)
@@ -45,7 +43,7 @@ async def receipt_amount(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return CLIENT
         
-    except:
+    except ValueError:
         await update.message.reply_text(
             "❌ Invalid amount. Please enter a number (e.g., 3500 or 3,500.00)"
         )
@@ -170,16 +168,19 @@ async def generate_receipt_pdf(update: Update, context: ContextTypes.DEFAULT_TYP
     )
     
     # Get current month and year for organizing files
-    current_month = config.get_current_month()
-    current_year = config.get_current_year()
+    current_year, current_month = config.get_current_year_month(state)
     
     # Use new organized folder structure
     pdf_path = config.get_receipt_path(receipt_id, current_year, current_month)
     
     # Generate PDF
+    from services import pdf_service
     pdf = pdf_service.PDFService()
-    success = pdf.generate_receipt(
-        output_path=pdf_path,
+    # Rendered in memory; the file is only written once the receipt is approved
+    pdf_buffer = io.BytesIO()
+    success = await asyncio.to_thread(
+        pdf.generate_receipt,
+        output_path=pdf_buffer,
         receipt_id=receipt_id,
         client=receipt_data['client'],
         amount=receipt_data['amount'],
@@ -203,18 +204,20 @@ async def generate_receipt_pdf(update: Update, context: ContextTypes.DEFAULT_TYP
     if receipt_data.get('payment_method'):
         summary += f"<b>Payment:</b> {receipt_data['payment_method']}\n"
     
-    # Send PDF for approval
-    with open(pdf_path, 'rb') as f:
-        await context.bot.send_document(
-            chat_id=chat_id,
-            document=f,
-            caption=summary,
-            parse_mode='HTML',
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("✅ Approve & Save", callback_data=f"approve_{receipt_id}_{receipt_data['amount']}_{receipt_data['client']}"),
-                InlineKeyboardButton("❌ Cancel", callback_data="cancel")
-            ]])
-        )
+    # Send PDF for approval, keeping it until approve/cancel (see callbacks.handle_callback)
+    pdf_bytes = pdf_buffer.getvalue()
+    stash_pending_document(context, receipt_id, pdf_path, pdf_bytes, current_year, current_month)
+    await context.bot.send_document(
+        chat_id=chat_id,
+        document=pdf_bytes,
+        filename=os.path.basename(pdf_path),
+        caption=summary,
+        parse_mode='HTML',
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("✅ Approve & Save", callback_data=approve_callback_data(receipt_id, receipt_data['amount'], receipt_data['client'])),
+            InlineKeyboardButton("❌ Cancel", callback_data="cancel")
+        ]])
+    )
 
 
 async def cancel_receipt(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -191,20 +191,25 @@ class LedgerService:
         if not os.path.exists(self.ledger_file):
             return []
         
-        wb = openpyxl.load_workbook(self.ledger_file)
-        ws = wb.active
-        
-        entries = []
-        
-        # Read from bottom up
-        start_row = max(2, ws.max_row - n + 1)
-        
-        for row in range(start_row, ws.max_row + 1):
-            entry = {}
-            for col_num, column in enumerate(LEDGER_COLUMNS, 1):
-                cell_value = ws.cell(row=row, column=col_num).value
-                entry[column] = cell_value
-            entries.append(entry)
+        # Read-only mode streams rows instead of building every cell of the workbook. It still
+        # parses the sheet XML from the top, so this is a linear scan that only keeps the tail.
+        wb = openpyxl.load_workbook(self.ledger_file, read_only=True)
+        try:
+            ws = wb.active
+            max_row = ws.max_row
+            
+            # Last n data rows (row 1 is the header)
+            start_row = max(2, max_row - n + 1)
+            
+            entries = [
+                dict(zip(LEDGER_COLUMNS, row))
+                for row in ws.iter_rows(
+                    min_row=start_row, max_row=max_row,
+                    max_col=len(LEDGER_COLUMNS), values_only=True,
+                )
+            ]
+        finally:
+            wb.close()
         
         return entries
     
@@ -254,9 +259,11 @@ class LedgerService:
         Returns:
             True if successful
         """
-        if year is None:
+        if year is None and month is None:
+            year, month = config.get_current_year_month()
+        elif year is None:
             year = config.get_current_year()
-        if month is None:
+        elif month is None:
             month = config.get_current_month()
         
         # Get paths for both ledgers
@@ -5,7 +5,7 @@ PDF generation service for invoices and receipts using WeasyPrint.
 from weasyprint import HTML, CSS
 from weasyprint.text.fonts import FontConfiguration
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import BinaryIO, Dict, Any, Optional, Union
 from jinja2 import Template
 import os
 
@@ -399,6 +399,10 @@ RECEIPT_TEMPLATE = """
 </html>
 """
 
+# Templates are compiled once; Template.render() is safe to call from several worker threads
+_INVOICE_TPL = Template(INVOICE_TEMPLATE)
+_RECEIPT_TPL = Template(RECEIPT_TEMPLATE)
+
 
 class PDFService:
     """Service for generating PDF invoices and receipts using WeasyPrint."""
@@ -409,7 +413,7 @@ class PDFService:
     
     def generate_invoice(
         self,
-        output_path: str,
+        output_path: Union[str, BinaryIO],
         invoice_id: str,
         client: str,
         amount: float,
@@ -423,7 +427,7 @@ class PDFService:
         Generate professional invoice/receipt PDF using WeasyPrint.
         
         Args:
-            output_path: Output file path
+            output_path: Output file path, or a writable binary stream (e.g. BytesIO)
             invoice_id: Invoice ID (e.g., R-2025-0001)
             client: Client name
             amount: Invoice amount
@@ -441,7 +445,8 @@ class PDFService:
                 date = datetime.now()
             
             # Ensure output directory exists
-            os.makedirs(os.path.dirname(output_path) if os.path.dirname(output_path) else ".", exist_ok=True)
+            if isinstance(output_path, str):
+                os.makedirs(os.path.dirname(output_path) if os.path.dirname(output_path) else ".", exist_ok=True)
             
             # Calculate VAT
             if vat_rate > 0:
@@ -457,9 +462,7 @@ class PDFService:
             date_str = date.strftime("%d/%m/%Y")
             
             # Render HTML from template
-            template = Template(INVOICE_TEMPLATE)
-            
-            html_content = template.render(
+            html_content = _INVOICE_TPL.render(
                 invoice_id=invoice_id,
                 invoice_date=date_str,
                 client_name=client,
@@ -481,7 +484,7 @@ class PDFService:
             font_config = FontConfiguration()
             HTML(string=html_content).write_pdf(output_path, font_config=font_config)
             
-            print(f"✅ Generated professional invoice: {output_path}")
+            print(f"✅ Generated professional invoice: {output_path if isinstance(output_path, str) else invoice_id}")
             return True
             
         except Exception as e:
@@ -492,7 +495,7 @@ class PDFService:
 
     def generate_receipt(
         self,
-        output_path: str,
+        output_path: Union[str, BinaryIO],
         receipt_id: str,
         client: str,
         amount: float,
@@ -505,17 +508,17 @@ class PDFService:
         vat_rate: float = 0.0,
         logo_path: Optional[str] = None,        # optional logo image path or data URI
     ) -> bool:
-        """Generate a clean receipt PDF."""
+        """Generate a clean receipt PDF to a file path or a writable binary stream."""
         try:
             date = date or datetime.now()
-            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+            if isinstance(output_path, str):
+                os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
 
             subtotal = amount / (1 + vat_rate) if vat_rate > 0 else amount
             vat_amount = amount - subtotal if vat_rate > 0 else 0.0
             vat_percent = int(vat_rate * 100)
 
-            tpl = Template(RECEIPT_TEMPLATE)
-            html_content = tpl.render(
+            html_content = _RECEIPT_TPL.render(
                 receipt_id=receipt_id,
                 receipt_date=date.strftime("%d/%m/%Y"),
                 client_name=client,
@@ -540,7 +543,7 @@ class PDFService:
                 output_path,
                 font_config=font_config  # ensures proper font embedding
             )
-            print(f"✅ Generated receipt: {output_path}")
+            print(f"✅ Generated receipt: {output_path if isinstance(output_path, str) else receipt_id}")
             return True
         except Exception as e:
             print(f"❌ Failed to generate receipt: {e}")
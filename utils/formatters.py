@@ -4,6 +4,7 @@ Number, date, and currency formatting utilities.
 
 import locale
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 
 
@@ -110,8 +111,9 @@ def format_percentage(value: float, decimals: int = 1) -> str:
     return f"{value * 100:.{decimals}f}%"
 
 
+@lru_cache(maxsize=512)
 def format_invoice_id(prefix: str, year: int, number: int) -> str:
-    """Format invoice ID (e.g., R-2025-0001)."""
+    """Format invoice ID (e.g., R-2025-0001). Cached, so repeated IDs share one string."""
     return f"{prefix}-{year}-{number:04d}"
 
 
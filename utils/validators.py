@@ -3,9 +3,20 @@ Input validation utilities.
 """
 
 from datetime import datetime
+from typing import Sequence, Union
 import re
 
 
+_AMOUNT_JUNK_RE = re.compile(r"[₪$,\s]")
+_UPDATE_PAIR_RE = re.compile(r"(\w+)=(\d+(?:\.\d+)?)")
+_DEPOSIT_PAIR_RE = re.compile(r"(pension|study)=(\d+(?:\.\d+)?)")
+_UPDATE_KEYS = frozenset({"income", "expenses", "pension", "study"})
+
+
+class AmountParseError(ValueError):
+    """Raised when an amount string can't be parsed."""
+
+
 def is_valid_amount(amount: str) -> bool:
     """Check if amount string is valid."""
     try:
@@ -16,10 +27,22 @@ def is_valid_amount(amount: str) -> bool:
 
 
 def parse_amount(amount_str: str) -> float:
-    """Parse amount string to float."""
+    """
+    Parse amount string to float.
+    
+    Raises:
+        AmountParseError: If the string is not a number (a ValueError subclass)
+    """
+    # Plain numbers (the common case) need no cleanup
+    try:
+        return float(amount_str)
+    except ValueError:
+        pass
     # Remove currency symbols and whitespace
-    cleaned = re.sub(r"[₪$,\s]", "", amount_str)
-    return float(cleaned)
+    try:
+        return float(_AMOUNT_JUNK_RE.sub("", amount_str))
+    except ValueError:
+        raise AmountParseError(f"Invalid amount: {amount_str!r}") from None
 
 
 def is_valid_month(month: int) -> bool:
@@ -33,48 +56,54 @@ def is_valid_year(year: int) -> bool:
     return 2020 <= year <= current_year + 1
 
 
-def parse_update_command(text: str) -> dict:
+def parse_update_command(text: Union[str, Sequence[str]]) -> dict:
     """
     Parse /update command arguments.
     
     Format: /update income=1000 expenses=200 pension=300 study=100
     
+    Args:
+        text: Raw command text, or the already-split arguments (context.args)
+    
     Returns:
         Dictionary with parsed values
     """
     result = {}
     
-    # Remove command prefix
-    text = text.lower().replace("/update", "").strip()
+    if isinstance(text, str):
+        # Remove command prefix
+        text = text.lower().replace("/update", "").strip()
+    else:
+        text = " ".join(text).lower()
     
     # Parse key=value pairs
-    pattern = r"(\w+)=(\d+(?:\.\d+)?)"
-    matches = re.findall(pattern, text)
-    
-    for key, value in matches:
-        if key in ["income", "expenses", "pension", "study"]:
+    for key, value in _UPDATE_PAIR_RE.findall(text):
+        if key in _UPDATE_KEYS:
             result[key] = float(value)
     
     return result
 
 
-def parse_deposit_command(text: str) -> dict:
+def parse_deposit_command(text: Union[str, Sequence[str]]) -> dict:
     """
     Parse /deposit command arguments.
     
     Format: /deposit pension=2000 study=500
     
+    Args:
+        text: Raw command text, or the already-split arguments (context.args)
+    
     Returns:
         Dictionary with parsed values
     """
     result = {}
     
-    text = text.lower().replace("/deposit", "").strip()
-    
-    pattern = r"(pension|study)=(\d+(?:\.\d+)?)"
-    matches = re.findall(pattern, text)
+    if isinstance(text, str):
+        text = text.lower().replace("/deposit", "").strip()
+    else:
+        text = " ".join(text).lower()
     
-    for key, value in matches:
+    for key, value in _DEPOSIT_PAIR_RE.findall(text):
         result[key] = float(value)
     
     return result